@@ -3,6 +3,11 @@ import logging
 from flask import Flask
 from flask_cors import CORS
 
+from config import config
+
+# CORS规则（模块级常量，多worker冷启动时随预导入复用）
+_CORS_RESOURCES = {r"/api/*": {"origins": "*"}}
+
 
 def create_app(config_name='default'):
     """创建Flask应用实例"""
@@ -17,15 +22,15 @@ def create_app(config_name='default'):
         )
     
     # 加载配置
-    from config import config
     app.config.from_object(config[config_name])
-    
+
     # 启用CORS
-    CORS(app, resources={r"/api/*": {"origins": "*"}})
-    
-    # 注册蓝图
+    CORS(app, resources=_CORS_RESOURCES)
+
+    # 注册蓝图（保持延迟导入：路由模块会拉起模型加载和任务队列）
     from app.routes import api_bp
-    app.register_blueprint(api_bp, url_prefix='/api')
+    for blueprint, url_prefix in [(api_bp, '/api')]:
+        app.register_blueprint(blueprint, url_prefix=url_prefix)
     
     logger = logging.getLogger(__name__)
     logger.info(f"Flask 应用初始化完成 (环境: {config_name})")
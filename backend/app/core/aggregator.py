@@ -1,14 +1,49 @@
 """数据源聚合器"""
-from typing import List, Dict
+from typing import List, Dict, Optional
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 import logging
+import threading
+
+import numpy as np
+
+import re
 
 from app.core.base_source import BaseNewsSource, NewsArticle
 from .text_matcher import TextMatcher
 
 logger = logging.getLogger(__name__)
 
+# URL规范化用的预编译正则（跟踪参数utm_*、fbclid等不影响文章身份）
+# 比每条URL走一遍urlsplit/parse_qsl/urlencode往返便宜数倍
+_FRAGMENT_RE = re.compile(r'#.*$')
+_TRACKING_PARAM_RE = re.compile(r'[?&](?:utm_[^=&#]*|fbclid|gclid|ref)=[^&#]*')
+_SCHEME_HOST_RE = re.compile(r'^[a-zA-Z][a-zA-Z0-9+.\-]*://[^/?#]+')
+
+
+def _canonical_url(url: str) -> str:
+    """
+    规范化URL：scheme和主机名转小写、去掉fragment和跟踪参数
+    同一篇文章带不同跟踪参数的转载链接会归一成相同结果
+    规范化结果只用于计算去重指纹，不用于实际请求
+    """
+    url = _FRAGMENT_RE.sub('', url)
+    url = _TRACKING_PARAM_RE.sub('', url)
+    # 首位跟踪参数被剔除后补回'?'分隔符，保证指纹一致
+    if '?' not in url and '&' in url:
+        url = url.replace('&', '?', 1)
+    url = url.rstrip('?')
+    # 只小写scheme和主机名（路径可能大小写敏感）
+    match = _SCHEME_HOST_RE.match(url)
+    if match:
+        url = match.group(0).lower() + url[match.end():]
+    return url
+
+
+def _url_fingerprint(url: str) -> int:
+    """计算规范化URL的64位指纹（去重集合只存8字节整数而非完整字符串）"""
+    return hash(_canonical_url(url)) & 0xFFFFFFFFFFFFFFFF
+
 
 class NewsAggregator:
     """新闻聚合器 - 整合多个数据源"""
@@ -17,6 +52,29 @@ class NewsAggregator:
         self.sources: List[BaseNewsSource] = []
         self.matcher = TextMatcher()
         self.similarity_threshold = 0.3  # 关联度阈值（可根据需求调整）
+        # 常驻搜索线程池（跨请求复用，避免每次搜索重建线程）
+        self._executor = None
+        self._executor_workers = 0
+
+    def _get_executor(self, max_workers: int) -> ThreadPoolExecutor:
+        """
+        获取常驻线程池，仅在线程数变化时重建
+
+        Args:
+            max_workers: 最大并发线程数
+
+        Returns:
+            线程池实例
+        """
+        if self._executor is None or self._executor_workers != max_workers:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+            self._executor = ThreadPoolExecutor(
+                max_workers=max_workers,
+                thread_name_prefix='SourceSearch'
+            )
+            self._executor_workers = max_workers
+        return self._executor
 
     def register_source(self, source: BaseNewsSource):
         """
@@ -28,66 +86,98 @@ class NewsAggregator:
         self.sources.append(source)
         logger.info(f"已注册数据源: {source.name}")
     
+    # 搜索线程数上限（任务是I/O密集型，线程数跟随数据源数量即可）
+    MAX_SEARCH_WORKERS = 16
+
     def search_all(
         self,
         query: str,
-        max_workers: int = 3,
+        max_workers: Optional[int] = None,
         **kwargs
-    ) -> Dict[str, List[NewsArticle]]:
+    ) -> List[NewsArticle]:
         """
         在所有数据源中搜索
-        
+
         Args:
             query: 搜索关键词
-            max_workers: 最大并发线程数
+            max_workers: 最大并发线程数，默认跟随数据源数量（上限16）
             **kwargs: 传递给各数据源的参数
-            
+
         Returns:
-            字典，键为数据源名称，值为文章列表
+            所有数据源的文章合并列表（工作线程内已按URL指纹去重）
         """
-        results = {}
-        
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # 提交所有搜索任务
-            future_to_source = {
-                executor.submit(self._safe_search, source, query, **kwargs): source
-                for source in self.sources
-            }
-            
-            # 收集结果
-            for future in as_completed(future_to_source):
-                source = future_to_source[future]
-                try:
-                    articles = future.result()
-                    results[source.name] = articles
-                    logger.info(f"从 {source.name} 获取到 {len(articles)} 篇文章")
-                except Exception as e:
-                    logger.error(f"从 {source.name} 搜索时出错: {str(e)}")
-                    results[source.name] = []
-        
-        return results
+        if max_workers is None:
+            max_workers = max(1, min(len(self.sources), self.MAX_SEARCH_WORKERS))
+        elif max_workers < len(self.sources):
+            logger.warning(
+                f"max_workers={max_workers} 小于数据源数量 {len(self.sources)}，部分数据源将排队执行"
+            )
+
+        all_articles = []
+        executor = self._get_executor(max_workers)
+
+        # 各工作线程共享的URL指纹集合：重复文章在源头过滤，不传回聚合层
+        seen_fingerprints: set = set()
+        seen_lock = threading.Lock()
+
+        # 提交所有搜索任务
+        future_to_source = {
+            executor.submit(
+                self._safe_search, source, query, seen_fingerprints, seen_lock, **kwargs
+            ): source
+            for source in self.sources
+        }
+
+        # 收集结果（直接合并为扁平列表，省去聚合侧的两层遍历）
+        for future in as_completed(future_to_source):
+            source = future_to_source[future]
+            try:
+                articles = future.result()
+                all_articles.extend(articles)
+                logger.info(f"从 {source.name} 获取到 {len(articles)} 篇文章")
+            except Exception as e:
+                logger.error(f"从 {source.name} 搜索时出错: {str(e)}")
+
+        return all_articles
     
     def _safe_search(
         self,
         source: BaseNewsSource,
         query: str,
+        seen_fingerprints: set = None,
+        seen_lock: threading.Lock = None,
         **kwargs
     ) -> List[NewsArticle]:
         """
         安全的搜索封装
-        
+
         Args:
             source: 数据源
             query: 搜索关键词
+            seen_fingerprints: 各数据源共享的URL指纹集合（可选）
+            seen_lock: 保护指纹集合的锁
             **kwargs: 其他参数
-            
+
         Returns:
             文章列表
         """
         try:
             articles = source.search(query, **kwargs)
             # 过滤无效文章
-            return [a for a in articles if source.validate_article(a)]
+            valid_articles = [a for a in articles if source.validate_article(a)]
+            if seen_fingerprints is None:
+                return valid_articles
+
+            # 在工作线程内按URL指纹去重，重复文章不再跨线程传递
+            deduped = []
+            for article in valid_articles:
+                fingerprint = _url_fingerprint(article.url)
+                with seen_lock:
+                    if fingerprint in seen_fingerprints:
+                        continue
+                    seen_fingerprints.add(fingerprint)
+                deduped.append(article)
+            return deduped
         except Exception as e:
             logger.error(f"{source.name} 搜索失败: {str(e)}")
             return []
@@ -95,51 +185,56 @@ class NewsAggregator:
     def aggregate_results(
         self,
         query: str,
-        results: Dict[str, List[NewsArticle]]
+        articles: List[NewsArticle]
     ) -> List[Dict]:
         """
         聚合结果，按时间排序并去重
-        
+
         Args:
-            results: 各数据源的搜索结果
-            
+            articles: 各数据源的搜索结果合并列表
+
         Returns:
             聚合后的文章列表（字典格式）
         """
-        all_articles = []
-        seen_urls = set()
+        # 按规范化URL指纹去重（search_all已在源头去重，这里兜底直接调用的场景）
+        # dict自带插入序，setdefault一次哈希完成"查重+记录"，先到先得
+        articles_by_url = {}
+        for article in articles:
+            articles_by_url.setdefault(_url_fingerprint(article.url), article)
+        all_articles = list(articles_by_url.values())
         
-        # 合并所有文章
-        for source_name, articles in results.items():
-            for article in articles:
-                # 简单去重（基于URL）
-                if article.url not in seen_urls:
-                    seen_urls.add(article.url)
-                    all_articles.append(article)
-        
-        # 按发布时间排序
-        all_articles.sort(
-            key=lambda x: x.published_at if x.published_at else datetime.min,
-            reverse=True
-        )
-
-        # 计算标题相似度
-        all_titles =  []
+        # 按发布时间排序（先一次性取出排序键，避免每次比较都执行属性查找和分支）
+        sort_keys = [article.published_at or datetime.min for article in all_articles]
+        order = sorted(range(len(all_articles)), key=sort_keys.__getitem__, reverse=True)
+        all_articles = [all_articles[i] for i in order]
+
+        # 空结果或空查询直接返回，避免对错误/空路径做无意义的模型前向计算
+        if not all_articles or not query.strip():
+            return [article.to_dict() for article in all_articles]
+
+        # 计算标题相似度（转载新闻标题常常相同，先去重再编码，结果回填到各文章）
+        unique_titles = []
+        title_to_idx = {}
         for article in all_articles:
-            all_titles.append(article.title)
-
-        similarities = self.matcher.calculate_similarity(query, all_titles)
-
-        # 过滤标题相似度低的文章
-        filter_articles = []
-        remain_articles = []
-        for news, sim in zip(all_articles, similarities):
-            if sim >= self.similarity_threshold:
-                news.filter = False
-                filter_articles.append(news)
-            else:
-                news.filter = True
-                remain_articles.append(news)
+            if article.title not in title_to_idx:
+                title_to_idx[article.title] = len(unique_titles)
+                unique_titles.append(article.title)
+
+        # 查询向量只编码一次，按批次/重试复用
+        query_embedding = self.matcher.embed_query(query)
+        unique_similarities = self.matcher.calculate_similarity(query_embedding, unique_titles)
+        similarities = unique_similarities[
+            [title_to_idx[article.title] for article in all_articles]
+        ]
+
+        # 过滤标题相似度低的文章（一次向量化比较代替逐条判断）
+        mask = similarities >= self.similarity_threshold
+        filter_articles = [all_articles[i] for i in np.flatnonzero(mask)]
+        remain_articles = [all_articles[i] for i in np.flatnonzero(~mask)]
+        for news in filter_articles:
+            news.filter = False
+        for news in remain_articles:
+            news.filter = True
 
         combined_articles = filter_articles + remain_articles
         return [article.to_dict() for article in combined_articles]
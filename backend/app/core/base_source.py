@@ -6,7 +6,13 @@ from datetime import datetime
 
 class NewsArticle:
     """新闻文章数据模型"""
-    
+
+    # 使用 __slots__ 压缩实例内存（聚合时内存中可能同时存在上千篇文章）
+    __slots__ = (
+        'title', 'url', 'source', '_filter', 'published_at',
+        'summary', 'content', 'author', 'image_url', 'tags', '_cached_dict'
+    )
+
     def __init__(
         self,
         title: str,
@@ -20,20 +26,34 @@ class NewsArticle:
         image_url: Optional[str] = None,
         tags: Optional[List[str]] = None
     ):
+        self._cached_dict = None
         self.title = title
         self.url = url
         self.source = source
         self.filter = filter
-        self.published_at = published_at or datetime.now()
+        # 缺失发布时间保持None（"现在"不是发布时间，且会破坏缓存键的确定性）
+        self.published_at = published_at
         self.summary = summary or ""
         self.content = content or ""
         self.author = author or ""
         self.image_url = image_url or ""
         self.tags = tags or []
     
+    @property
+    def filter(self) -> bool:
+        return self._filter
+
+    @filter.setter
+    def filter(self, value: bool):
+        self._filter = value
+        # filter变更后缓存的字典失效
+        self._cached_dict = None
+
     def to_dict(self) -> Dict:
-        """转换为字典"""
-        return {
+        """转换为字典（结果缓存，重复序列化时不再重建字典和ISO时间串）"""
+        if self._cached_dict is not None:
+            return self._cached_dict
+        self._cached_dict = {
             'title': self.title,
             'url': self.url,
             'source': self.source,
@@ -45,6 +65,7 @@ class NewsArticle:
             'image_url': self.image_url,
             'tags': self.tags
         }
+        return self._cached_dict
 
 
 class BaseNewsSource(ABC):
@@ -2,9 +2,13 @@
 import logging
 import json
 import os
+import queue
+import threading
+import time
 from typing import List, Dict, Optional
 from datetime import datetime
 from difflib import SequenceMatcher
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 from sklearn.cluster import AgglomerativeClustering
 from config import Config
@@ -19,6 +23,114 @@ except ImportError:
     SENTENCE_TRANSFORMERS_AVAILABLE = False
     logger.warning("sentence-transformers 未安装，将使用字符级别相似度计算。建议安装：pip install sentence-transformers")
 
+# 尝试导入 rapidfuzz（C++实现的字符串相似度，支持多核批量计算），失败则回退 difflib
+try:
+    from rapidfuzz import fuzz as rf_fuzz
+    from rapidfuzz import process as rf_process
+    RAPIDFUZZ_AVAILABLE = True
+except ImportError:
+    RAPIDFUZZ_AVAILABLE = False
+
+# 尝试导入 fastcluster（NN-chain层次聚类的C实现，O(n²)），失败则回退 sklearn
+try:
+    import fastcluster
+    from scipy.cluster.hierarchy import fcluster
+    from scipy.spatial.distance import squareform
+    FASTCLUSTER_AVAILABLE = True
+except ImportError:
+    FASTCLUSTER_AVAILABLE = False
+
+# 尝试导入 orjson（C实现的JSON编解码，大体量编码记录的读写快数倍），失败则回退标准库
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class EncoderBatcher:
+    """
+    跨线程编码合批器
+
+    任务队列的多个工作线程各自提交小批量文本时，由单个派发线程把请求
+    合并成一次模型前向（共享同一模型实例，避免并发encode互相争抢），
+    再按提交者切分返回。请求方阻塞等待结果。
+    """
+
+    def __init__(self, encode_fn, max_batch: int = 64, gather_window: float = 0.005):
+        """
+        Args:
+            encode_fn: 批量编码函数，接收文本列表返回 (n, 特征维度) 矩阵
+            max_batch: 单次前向的最大文本数
+            gather_window: 取到首个请求后等待合批的时间窗（秒）
+        """
+        self._encode_fn = encode_fn
+        self._max_batch = max_batch
+        self._gather_window = gather_window
+        self._queue: queue.Queue = queue.Queue()
+        self._dispatcher = None
+        self._lock = threading.Lock()
+
+    def _ensure_dispatcher(self):
+        """懒启动派发线程（daemon，随进程退出）"""
+        if self._dispatcher is not None and self._dispatcher.is_alive():
+            return
+        with self._lock:
+            if self._dispatcher is None or not self._dispatcher.is_alive():
+                self._dispatcher = threading.Thread(
+                    target=self._dispatcher_loop,
+                    name='EncoderBatcher',
+                    daemon=True
+                )
+                self._dispatcher.start()
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """
+        提交编码请求并阻塞等待结果
+
+        Args:
+            texts: 文本列表
+
+        Returns:
+            向量矩阵 (len(texts), 特征维度)
+        """
+        request = {'texts': list(texts), 'done': threading.Event(),
+                   'result': None, 'error': None}
+        self._ensure_dispatcher()
+        self._queue.put(request)
+        request['done'].wait()
+        if request['error'] is not None:
+            raise request['error']
+        return request['result']
+
+    def _dispatcher_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            # 短暂等待，给并发到达的请求一个合批窗口
+            time.sleep(self._gather_window)
+            total = len(batch[0]['texts'])
+            while total < self._max_batch:
+                try:
+                    request = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(request)
+                total += len(request['texts'])
+
+            texts = [t for request in batch for t in request['texts']]
+            try:
+                embeddings = self._encode_fn(texts)
+                offset = 0
+                for request in batch:
+                    count = len(request['texts'])
+                    request['result'] = embeddings[offset:offset + count]
+                    offset += count
+            except Exception as e:
+                for request in batch:
+                    request['error'] = e
+            finally:
+                for request in batch:
+                    request['done'].set()
+
 
 class BERTEncoder:
     """BERT编码器 - 将相似的关键词聚合为统一的关键词"""
@@ -28,6 +140,18 @@ class BERTEncoder:
     
     # 中文语义相似度模型（懒加载）
     _semantic_model = None
+
+    # 关键词向量缓存（类级共享）：每个唯一关键词在进程生命周期内只编码一次
+    _keyword_embedding_cache: Dict[str, 'np.ndarray'] = {}
+
+    # 编码批大小（GPU可用时在模型加载处调大）
+    _encode_batch_size = 32
+
+    # 模型是否在GPU上（GPU上并行聚类只会让encode串行排队，保持顺序执行）
+    _model_on_gpu = False
+
+    # 保护聚类统计的并发写入（batch_encode_media并行聚类各字段）
+    _stats_lock = threading.Lock()
     
     # 特殊规则映射（优先级最高）
     SPECIAL_RULES = {
@@ -75,6 +199,8 @@ class BERTEncoder:
         self.last_clustering_stats: Optional[Dict] = None
         # 当前聚类映射（临时变量）
         self._current_cluster_mapping: Dict[str, str] = {}
+        # 全局最终映射：{字段名: {原始关键词: 最终代表词}}，由batch_encode_media构建
+        self._global_field_map: Dict[str, Dict[str, str]] = {}
         # 记录文件路径
         self.record_file = Config.BERT_ENCODING_RECORD_FILE
         # 是否使用语义相似度
@@ -93,8 +219,21 @@ class BERTEncoder:
                 # 使用多语言模型，支持中文
                 # paraphrase-multilingual-MiniLM-L12-v2 是一个轻量级多语言模型
                 logger.info("正在加载中文语义相似度模型...")
-                BERTEncoder._semantic_model = SentenceTransformer('paraphrase-multilingual-MiniLM-L12-v2')
-                logger.info("中文语义相似度模型加载成功")
+                import torch
+                # 日志级别和进度条在模型加载时配置一次即可
+                # （HF只在logger初始化时读取环境变量，逐次调用前改os.environ无效）
+                from transformers import logging as hf_logging
+                hf_logging.set_verbosity_error()
+                hf_logging.disable_progress_bar()
+                device = 'cuda' if torch.cuda.is_available() else 'cpu'
+                model = SentenceTransformer('paraphrase-multilingual-MiniLM-L12-v2', device=device)
+                if device == 'cuda':
+                    # GPU上切半精度推理，批大小也可以放大
+                    model = model.half()
+                    BERTEncoder._encode_batch_size = 128
+                    BERTEncoder._model_on_gpu = True
+                BERTEncoder._semantic_model = model
+                logger.info(f"中文语义相似度模型加载成功（设备: {device}）")
             except Exception as e:
                 logger.warning(f"加载语义相似度模型失败: {str(e)}，将使用字符级别相似度")
                 BERTEncoder._semantic_model = None  # 标记为加载失败，避免重复尝试
@@ -147,10 +286,25 @@ class BERTEncoder:
         
         # 分割关键词（保存原始关键词）
         original_keywords = [k.strip() for k in value.split('/') if k.strip()]
-        
+
         if not original_keywords:
             return value
-        
+
+        # 快速路径：batch_encode_media已为该字段算好"原始关键词->最终代表词"映射，
+        # 逐媒体编码退化为纯字典查找，不再重复走规则和聚类
+        final_map = self._global_field_map.get(field_name)
+        if final_map is not None and all(k in final_map for k in original_keywords):
+            field_mapping = self.encoding_mapping.setdefault(field_name, {})
+            for k in original_keywords:
+                field_mapping[k] = final_map[k]
+            return '/'.join(dict.fromkeys(final_map[k] for k in original_keywords))
+
+        # 热路径：历史记录已覆盖全部关键词时直接查表拼接，
+        # 跳过规则、聚类和模型调用（映射含恒等项，in检查即覆盖检查）
+        cached = self.encoding_mapping.get(field_name)
+        if cached and all(k in cached for k in original_keywords):
+            return '/'.join(dict.fromkeys(cached[k] for k in original_keywords))
+
         # 初始化字段映射（如果不存在）
         if field_name not in self.encoding_mapping:
             self.encoding_mapping[field_name] = {}
@@ -215,9 +369,8 @@ class BERTEncoder:
             rule_result = orig_to_rule_mapping.get(orig_keyword, orig_keyword)
             # 找到规则结果对应的聚类代表词
             final_result = cluster_rep_map.get(rule_result, rule_result)
-            # 记录映射（如果发生变化）
-            if orig_keyword != final_result:
-                self.encoding_mapping[field_name][orig_keyword] = final_result
+            # 记录映射（包含恒等映射，使热路径能以in检查判断覆盖情况）
+            self.encoding_mapping[field_name][orig_keyword] = final_result
         
         # 去重并保持顺序
         seen = set()
@@ -229,44 +382,151 @@ class BERTEncoder:
         
         return '/'.join(unique_keywords)
     
+    # SPECIAL_RULES 预编译结果：{字段: (精确匹配字典, [(变体, 标准词), ...])}
+    _compiled_rules = None
+
+    @classmethod
+    def _get_compiled_rules(cls):
+        """将SPECIAL_RULES预编译为扁平查找结构（类加载后只构建一次）"""
+        if cls._compiled_rules is None:
+            compiled = {}
+            for field_name, rules in cls.SPECIAL_RULES.items():
+                exact = {}
+                substring_pairs = []
+                for standard_term, variants in rules.items():
+                    for variant in variants + [standard_term]:
+                        exact.setdefault(variant, standard_term)
+                        substring_pairs.append((variant, standard_term))
+                compiled[field_name] = (exact, tuple(substring_pairs))
+            cls._compiled_rules = compiled
+        return cls._compiled_rules
+
     def _apply_special_rules(self, field_name: str, keywords: List[str]) -> List[str]:
         """
         应用特殊规则映射
-        
+
         Args:
             field_name: 字段名
             keywords: 关键词列表
-            
+
         Returns:
             应用规则后的关键词列表
         """
-        if field_name not in self.SPECIAL_RULES:
+        compiled = self._get_compiled_rules()
+        if field_name not in compiled:
             return keywords
-        
-        rules = self.SPECIAL_RULES[field_name]
+
+        exact, substring_pairs = compiled[field_name]
         result = []
-        
+
         for keyword in keywords:
-            matched = False
-            # 检查是否匹配任何规则
-            for standard_term, variants in rules.items():
-                # 检查精确匹配或包含关系
-                if keyword == standard_term or keyword in variants:
-                    result.append(standard_term)
-                    matched = True
-                    break
-                # 检查关键词是否包含标准术语或其变体
-                elif any(variant in keyword or keyword in variant 
-                        for variant in variants + [standard_term]):
-                    result.append(standard_term)
-                    matched = True
-                    break
-            
-            if not matched:
-                result.append(keyword)
-        
+            # 精确匹配走O(1)字典查找；未命中时再按规则顺序做包含检查
+            standard_term = exact.get(keyword)
+            if standard_term is None:
+                for variant, candidate in substring_pairs:
+                    if variant in keyword or keyword in variant:
+                        standard_term = candidate
+                        break
+            result.append(standard_term if standard_term is not None else keyword)
+
         return result
     
+    def _record_field_stats(
+        self,
+        field_name: str,
+        keywords: List[str],
+        similarity_matrix,
+        cluster_details: List[Dict],
+        total_clusters: int,
+        representatives_count: int
+    ):
+        """
+        记录单个字段的聚类统计信息
+
+        相似度矩阵直接保留ndarray，序列化时（_save_record/对外接口）再转列表，
+        避免在聚类热路径上为n²个元素分配Python float
+
+        Args:
+            field_name: 字段名
+            keywords: 参与聚类的关键词列表
+            similarity_matrix: 相似度矩阵（ndarray）
+            cluster_details: 聚类详情列表
+            total_clusters: 聚类总数
+            representatives_count: 代表词数量
+        """
+        # 统计可能被并行的字段聚类线程同时写入，加锁保护
+        with BERTEncoder._stats_lock:
+            if not self.last_clustering_stats:
+                self.last_clustering_stats = {
+                    'timestamp': datetime.now().isoformat(),
+                    'fields': {}
+                }
+            if 'fields' not in self.last_clustering_stats:
+                self.last_clustering_stats['fields'] = {}
+
+            # before_count/after_count/reduction 为临时值，会在 batch_encode 中统一更新
+            # 矩阵转FP16常驻（相似度只需两位小数精度，内存占用减半再减半）
+            self.last_clustering_stats['fields'][field_name] = {
+                'before_count': len(keywords),
+                'after_count': representatives_count,
+                'reduction': 0,
+                'reduction_rate': 0.0,
+                'clusters': cluster_details,
+                'total_clusters': total_clusters,
+                'clustered_keywords': len(keywords) - representatives_count,
+                'similarity_matrix': {
+                    'keywords': keywords,
+                    'matrix': np.asarray(similarity_matrix).astype(np.float16)
+                }
+            }
+            self.last_clustering_stats['timestamp'] = datetime.now().isoformat()
+
+    def _stats_for_json(self) -> Optional[Dict]:
+        """将聚类统计转换为可JSON序列化的形式（相似度矩阵延迟转列表）"""
+        if not self.last_clustering_stats:
+            return self.last_clustering_stats
+
+        stats = dict(self.last_clustering_stats)
+        serializable_fields = {}
+        for field_name, field_stats in stats.get('fields', {}).items():
+            sim = field_stats.get('similarity_matrix')
+            if sim and isinstance(sim.get('matrix'), np.ndarray):
+                field_stats = dict(field_stats)
+                field_stats['similarity_matrix'] = {
+                    'keywords': sim['keywords'],
+                    'matrix': sim['matrix'].tolist()
+                }
+            serializable_fields[field_name] = field_stats
+        stats['fields'] = serializable_fields
+        return stats
+
+    def _matrices_file(self) -> str:
+        """相似度矩阵sidecar文件路径（与JSON记录同目录）"""
+        return os.path.splitext(self.record_file)[0] + '_matrices.npz'
+
+    def _stats_for_disk(self, matrices: Dict[str, np.ndarray]) -> Optional[Dict]:
+        """
+        将聚类统计转换为落盘形式：矩阵抽出到matrices字典（写入.npz sidecar），
+        JSON中只保留关键词列表和矩阵引用，避免序列化n²个浮点数
+        """
+        if not self.last_clustering_stats:
+            return self.last_clustering_stats
+
+        stats = dict(self.last_clustering_stats)
+        serializable_fields = {}
+        for field_name, field_stats in stats.get('fields', {}).items():
+            sim = field_stats.get('similarity_matrix')
+            if sim and isinstance(sim.get('matrix'), np.ndarray):
+                matrices[field_name] = sim['matrix']
+                field_stats = dict(field_stats)
+                field_stats['similarity_matrix'] = {
+                    'keywords': sim['keywords'],
+                    'matrix_ref': field_name
+                }
+            serializable_fields[field_name] = field_stats
+        stats['fields'] = serializable_fields
+        return stats
+
     def _cluster_by_similarity(self, keywords: List[str], field_name: str = None) -> List[str]:
         """
         基于相似度聚类关键词（使用层次聚类算法）
@@ -282,36 +542,15 @@ class BERTEncoder:
             # 即使只有一个关键词，也要设置映射关系
             if keywords:
                 self._current_cluster_mapping[keywords[0]] = keywords[0]
-                
+
                 # 保存相似性矩阵（只有一个元素）
                 if field_name:
-                    similarity_matrix = np.array([[1.0]]) if len(keywords) == 1 else np.array([])
-                    similarity_matrix_list = similarity_matrix.tolist() if len(keywords) == 1 else []
-                    
-                    if not self.last_clustering_stats:
-                        self.last_clustering_stats = {
-                            'timestamp': datetime.now().isoformat(),
-                            'fields': {}
-                        }
-                    if 'fields' not in self.last_clustering_stats:
-                        self.last_clustering_stats['fields'] = {}
-                    
-                    self.last_clustering_stats['fields'][field_name] = {
-                        'before_count': len(keywords),
-                        'after_count': len(keywords),
-                        'reduction': 0,
-                        'reduction_rate': 0.0,
-                        'clusters': [],
-                        'total_clusters': len(keywords),
-                        'clustered_keywords': 0,
-                        'similarity_matrix': {
-                            'keywords': keywords,
-                            'matrix': similarity_matrix_list
-                        }
-                    }
-                    self.last_clustering_stats['timestamp'] = datetime.now().isoformat()
+                    self._record_field_stats(
+                        field_name, keywords, np.ones((1, 1)),
+                        cluster_details=[], total_clusters=1, representatives_count=1
+                    )
             return keywords
-        
+
         # 批量计算相似度矩阵
         similarity_matrix = self._calculate_similarity_matrix_batch(keywords)
         
@@ -323,16 +562,23 @@ class BERTEncoder:
         # 即如果相似度 >= similarity_threshold，则距离 <= (1 - similarity_threshold)
         distance_threshold = 1.0 - self.similarity_threshold
         
-        # 使用 AgglomerativeClustering 进行聚类
-        clustering = AgglomerativeClustering(
-            n_clusters=None,  # 不指定聚类数量，使用距离阈值
-            distance_threshold=distance_threshold,
-            metric='precomputed',  # 使用预计算的距离矩阵
-            linkage='average'  # 使用平均链接
-        )
-        
         try:
-            cluster_labels = clustering.fit_predict(distance_matrix)
+            if FASTCLUSTER_AVAILABLE:
+                # fastcluster的average链接与sklearn结果一致，但走C实现的NN-chain
+                condensed = squareform(distance_matrix, checks=False)
+                linkage_matrix = fastcluster.linkage(condensed, method='average')
+                cluster_labels = fcluster(
+                    linkage_matrix, t=distance_threshold, criterion='distance'
+                ) - 1
+            else:
+                # 使用 AgglomerativeClustering 进行聚类
+                clustering = AgglomerativeClustering(
+                    n_clusters=None,  # 不指定聚类数量，使用距离阈值
+                    distance_threshold=distance_threshold,
+                    metric='precomputed',  # 使用预计算的距离矩阵
+                    linkage='average'  # 使用平均链接
+                )
+                cluster_labels = clustering.fit_predict(distance_matrix)
         except Exception as e:
             logger.warning(f"聚类算法执行失败: {str(e)}，回退到贪心方法")
             return self._cluster_by_similarity_greedy(keywords, field_name=field_name)
@@ -379,33 +625,13 @@ class BERTEncoder:
         
         # 记录聚类统计信息
         if field_name:
-            if not self.last_clustering_stats:
-                self.last_clustering_stats = {
-                    'timestamp': datetime.now().isoformat(),
-                    'fields': {}
-                }
-            if 'fields' not in self.last_clustering_stats:
-                self.last_clustering_stats['fields'] = {}
-            
-            # 将相似性矩阵转换为列表（numpy数组不能直接JSON序列化）
-            similarity_matrix_list = similarity_matrix.tolist()
-            
-            # 记录聚类详情（before_count 和 after_count 会在 batch_encode 中统一更新）
-            self.last_clustering_stats['fields'][field_name] = {
-                'before_count': len(keywords),  # 临时值，会在 batch_encode 中被覆盖
-                'after_count': len(representatives),  # 临时值，会在 batch_encode 中被覆盖
-                'reduction': 0,  # 临时值，会在 batch_encode 中被覆盖
-                'reduction_rate': 0.0,  # 临时值，会在 batch_encode 中被覆盖
-                'clusters': cluster_details,  # 保留聚类详情
-                'total_clusters': len(clusters_dict),
-                'clustered_keywords': len(keywords) - len(representatives),
-                'similarity_matrix': {
-                    'keywords': keywords,  # 关键词列表（顺序与矩阵对应）
-                    'matrix': similarity_matrix_list  # 相似度矩阵（二维数组）
-                }
-            }
-            self.last_clustering_stats['timestamp'] = datetime.now().isoformat()
-        
+            self._record_field_stats(
+                field_name, keywords, similarity_matrix,
+                cluster_details=cluster_details,
+                total_clusters=len(clusters_dict),
+                representatives_count=len(representatives)
+            )
+
         logger.debug(
             f"聚类完成: {len(keywords)} 个关键词聚类为 {len(representatives)} 个"
         )
@@ -429,76 +655,54 @@ class BERTEncoder:
                 if not hasattr(self, '_current_cluster_mapping'):
                     self._current_cluster_mapping = {}
                 self._current_cluster_mapping[keywords[0]] = keywords[0]
-                
+
                 # 保存相似性矩阵（只有一个元素）
                 if field_name:
-                    similarity_matrix = np.array([[1.0]]) if len(keywords) == 1 else np.array([])
-                    similarity_matrix_list = similarity_matrix.tolist() if len(keywords) == 1 else []
-                    
-                    if not self.last_clustering_stats:
-                        self.last_clustering_stats = {
-                            'timestamp': datetime.now().isoformat(),
-                            'fields': {}
-                        }
-                    if 'fields' not in self.last_clustering_stats:
-                        self.last_clustering_stats['fields'] = {}
-                    
-                    self.last_clustering_stats['fields'][field_name] = {
-                        'before_count': len(keywords),
-                        'after_count': len(keywords),
-                        'reduction': 0,
-                        'reduction_rate': 0.0,
-                        'clusters': [],
-                        'total_clusters': len(keywords),
-                        'clustered_keywords': 0,
-                        'similarity_matrix': {
-                            'keywords': keywords,
-                            'matrix': similarity_matrix_list
-                        }
-                    }
-                    self.last_clustering_stats['timestamp'] = datetime.now().isoformat()
+                    self._record_field_stats(
+                        field_name, keywords, np.ones((1, 1)),
+                        cluster_details=[], total_clusters=1, representatives_count=1
+                    )
             return keywords
         
+        # 相似性矩阵在循环前一次算好（批量编码可摊销），
+        # 循环内只做矩阵索引，不再为每个词对单独调用模型
+        similarity_matrix = self._calculate_similarity_matrix_batch(keywords)
+        index_of = {kw: i for i, kw in enumerate(keywords)}
+
         # 创建聚类
         clusters = []
         cluster_mapping = {}  # 记录每个关键词到代表词的映射
         unassigned = keywords.copy()
-        
+
         while unassigned:
             # 取第一个未分配的关键词作为聚类中心
             center = unassigned.pop(0)
             cluster = [center]
-            
+            center_similarities = similarity_matrix[index_of[center]]
+
             # 查找相似的关键词
             remaining = []
             for keyword in unassigned:
-                similarity = self._calculate_similarity(center, keyword)
-                if similarity >= self.similarity_threshold:
+                if center_similarities[index_of[keyword]] >= self.similarity_threshold:
                     cluster.append(keyword)
                 else:
                     remaining.append(keyword)
-            
+
             # 选择最合适的代表词（通常是较短的）
             representative = self._choose_representative(cluster)
             clusters.append(representative)
-            
+
             # 记录映射关系
             for member in cluster:
                 cluster_mapping[member] = representative
-            
+
             unassigned = remaining
-        
+
         # 更新当前聚类映射
         if not hasattr(self, '_current_cluster_mapping'):
             self._current_cluster_mapping = {}
         self._current_cluster_mapping.update(cluster_mapping)
-        
-        # 批量计算相似性矩阵（贪心方法也需要保存，使用批量计算以减少日志）
-        similarity_matrix = self._calculate_similarity_matrix_batch(keywords)
-        
-        # 将相似性矩阵转换为列表
-        similarity_matrix_list = similarity_matrix.tolist()
-        
+
         # 记录聚类统计信息（简化版）
         if field_name:
             cluster_details = []
@@ -508,7 +712,7 @@ class BERTEncoder:
                 if rep not in cluster_groups:
                     cluster_groups[rep] = []
                 cluster_groups[rep].append(keyword)
-            
+
             for rep, members in cluster_groups.items():
                 if len(members) > 1:
                     cluster_details.append({
@@ -516,33 +720,94 @@ class BERTEncoder:
                         'members': members,
                         'size': len(members)
                     })
-            
-            if not self.last_clustering_stats:
-                self.last_clustering_stats = {
-                    'timestamp': datetime.now().isoformat(),
-                    'fields': {}
-                }
-            if 'fields' not in self.last_clustering_stats:
-                self.last_clustering_stats['fields'] = {}
-            
-            # 记录聚类详情（before_count 和 after_count 会在 batch_encode 中统一更新）
-            self.last_clustering_stats['fields'][field_name] = {
-                'before_count': len(keywords),  # 临时值，会在 batch_encode 中被覆盖
-                'after_count': len(clusters),  # 临时值，会在 batch_encode 中被覆盖
-                'reduction': 0,  # 临时值，会在 batch_encode 中被覆盖
-                'reduction_rate': 0.0,  # 临时值，会在 batch_encode 中被覆盖
-                'clusters': cluster_details,  # 保留聚类详情
-                'total_clusters': len(clusters),
-                'clustered_keywords': len(keywords) - len(clusters),
-                'similarity_matrix': {
-                    'keywords': keywords,
-                    'matrix': similarity_matrix_list
-                }
-            }
-            self.last_clustering_stats['timestamp'] = datetime.now().isoformat()
-        
+
+            self._record_field_stats(
+                field_name, keywords, similarity_matrix,
+                cluster_details=cluster_details,
+                total_clusters=len(clusters),
+                representatives_count=len(clusters)
+            )
+
         return clusters
     
+    def _encode_keywords(self, keywords: List[str]) -> Optional[np.ndarray]:
+        """
+        批量获取关键词的语义向量，只对缓存未命中的关键词调用模型
+
+        Args:
+            keywords: 关键词列表
+
+        Returns:
+            向量矩阵 (n x 特征维度)，模型不可用时返回None
+        """
+        semantic_model = self._get_semantic_model()
+        if semantic_model is None:
+            return None
+
+        cache = BERTEncoder._keyword_embedding_cache
+        missing = [kw for kw in dict.fromkeys(keywords) if kw not in cache]
+
+        if missing:
+            # smart batching：按长度排序编码，减少批内padding浪费
+            # 结果按关键词写回缓存，无需恢复原顺序
+            missing.sort(key=len)
+            # 归一化融合进模型前向，后续余弦相似度退化为纯矩阵乘
+            embeddings = semantic_model.encode(
+                missing,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False,
+                batch_size=self._encode_batch_size
+            )
+            # 缓存用FP16存储（余弦相似度对半精度不敏感，常驻内存减半）
+            for kw, embedding in zip(missing, embeddings):
+                cache[kw] = embedding.astype(np.float16)
+
+        # 计算仍在FP32下进行（NumPy的FP16矩阵乘无BLAS加速）
+        return np.vstack([cache[kw] for kw in keywords]).astype(np.float32)
+
+    @staticmethod
+    def _containment_matrix(keywords: List[str]) -> np.ndarray:
+        """
+        构建关键词包含关系布尔矩阵（bigram倒排桶预过滤）
+
+        只有共享至少一个bigram（单字词则为该字符）的关键词对才做真正的
+        子串检测，避免对全部n²个词对做子串扫描
+
+        Args:
+            keywords: 关键词列表
+
+        Returns:
+            对称布尔矩阵 (n x n)，True表示一方是另一方的子串
+        """
+        n = len(keywords)
+        contains = np.zeros((n, n), dtype=bool)
+
+        # bigram -> 关键词下标 倒排桶（单字关键词以该字符入桶）
+        gram_to_idx = {}
+        for idx, kw in enumerate(keywords):
+            if len(kw) < 2:
+                gram_to_idx.setdefault(kw, set()).add(idx)
+            for pos in range(len(kw) - 1):
+                gram_to_idx.setdefault(kw[pos:pos + 2], set()).add(idx)
+
+        empty = frozenset()
+        for idx, kw in enumerate(keywords):
+            candidates = set()
+            for pos in range(len(kw) - 1):
+                candidates |= gram_to_idx.get(kw[pos:pos + 2], empty)
+            # 单字关键词只能通过字符桶被较长的词找到
+            for ch in kw:
+                candidates |= gram_to_idx.get(ch, empty)
+            candidates.discard(idx)
+            for other in candidates:
+                if contains[idx, other]:
+                    continue
+                if kw in keywords[other] or keywords[other] in kw:
+                    contains[idx, other] = True
+                    contains[other, idx] = True
+        return contains
+
     def _calculate_similarity_matrix_batch(self, keywords: List[str]) -> np.ndarray:
         """
         批量计算关键词相似度矩阵（优化性能，减少日志输出）
@@ -554,90 +819,65 @@ class BERTEncoder:
             相似度矩阵 (n x n numpy array)
         """
         n = len(keywords)
-        similarity_matrix = np.zeros((n, n))
-        
-        # 完全匹配和包含关系的快速检查
-        for i in range(n):
-            similarity_matrix[i][i] = 1.0
-            for j in range(i + 1, n):
-                # 完全匹配
-                if keywords[i] == keywords[j]:
-                    similarity_matrix[i][j] = 1.0
-                    similarity_matrix[j][i] = 1.0
-                    continue
-                
-                # 包含关系检查
-                if keywords[i] in keywords[j] or keywords[j] in keywords[i]:
-                    shorter = min(len(keywords[i]), len(keywords[j]))
-                    longer = max(len(keywords[i]), len(keywords[j]))
-                    ratio = shorter / longer
-                    if ratio > 0.5:
-                        similarity = min(0.9, 0.7 + ratio * 0.2)
-                    else:
-                        similarity = ratio
-                    similarity_matrix[i][j] = similarity
-                    similarity_matrix[j][i] = similarity
-                    continue
-        
+
+        # 完全匹配和包含关系的快速检查（一次构建布尔矩阵，加成分数向量化计算）
+        keywords_arr = np.array(keywords, dtype=object)
+        exact_match = keywords_arr[:, None] == keywords_arr[None, :]
+        contains = self._containment_matrix(keywords)
+        lens = np.fromiter((len(k) for k in keywords), dtype=np.int64, count=n)
+        shorter = np.minimum(lens[:, None], lens[None, :])
+        longer = np.maximum(lens[:, None], lens[None, :])
+        ratio = shorter / np.maximum(longer, 1)
+        boosted = np.where(ratio > 0.5, np.minimum(0.9, 0.7 + ratio * 0.2), ratio)
+        similarity_matrix = np.where(exact_match, 1.0, np.where(contains, boosted, 0.0))
+
+
         # 尝试使用语义相似度模型批量计算
+        semantic_ok = False
         semantic_model = self._get_semantic_model()
         if semantic_model:
             try:
-                # 批量编码所有关键词（一次性处理，减少日志输出）
-                # 设置环境变量来抑制进度条
-                old_env = os.environ.get('TRANSFORMERS_VERBOSITY', None)
-                os.environ['TRANSFORMERS_VERBOSITY'] = 'error'  # 抑制进度条
-                
-                try:
-                    # 批量编码
-                    embeddings = semantic_model.encode(
-                        keywords, 
-                        convert_to_numpy=True,
-                        show_progress_bar=False,  # 禁用进度条
-                        batch_size=32
-                    )
-                    
-                    # 批量计算余弦相似度矩阵
-                    # 归一化向量
-                    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
-                    norms[norms == 0] = 1  # 避免除零
-                    embeddings_normalized = embeddings / norms
-                    
-                    # 计算余弦相似度矩阵 (embeddings_normalized @ embeddings_normalized.T)
-                    semantic_similarity_matrix = np.dot(embeddings_normalized, embeddings_normalized.T)
-                    
-                    # 确保值在 [0, 1] 范围内
-                    semantic_similarity_matrix = np.clip(semantic_similarity_matrix, 0.0, 1.0)
-                    
-                    # 对于已经计算过的完全匹配和包含关系，保留原值；否则使用语义相似度
-                    for i in range(n):
-                        for j in range(i + 1, n):
-                            # 如果相似度矩阵中还没有值（即不是完全匹配也不是包含关系），使用语义相似度
-                            # 或者语义相似度更高，则使用语义相似度
-                            if similarity_matrix[i][j] == 0.0 or semantic_similarity_matrix[i][j] > similarity_matrix[i][j]:
-                                similarity_matrix[i][j] = float(semantic_similarity_matrix[i][j])
-                                similarity_matrix[j][i] = float(semantic_similarity_matrix[i][j])
-                
-                finally:
-                    # 恢复环境变量
-                    if old_env is None:
-                        os.environ.pop('TRANSFORMERS_VERBOSITY', None)
-                    else:
-                        os.environ['TRANSFORMERS_VERBOSITY'] = old_env
-                        
+                # 批量编码（带缓存，重复出现的关键词不再走前向计算）
+                # 向量已在encode时归一化，余弦相似度矩阵就是一次矩阵乘
+                embeddings = self._encode_keywords(keywords)
+                semantic_similarity_matrix = np.dot(embeddings, embeddings.T)
+
+                # 确保值在 [0, 1] 范围内
+                semantic_similarity_matrix = np.clip(semantic_similarity_matrix, 0.0, 1.0)
+
+                # 合并：字符级未覆盖的位置取语义值，已覆盖的位置取两者较大值
+                # （一次ufunc完成，替代原先的逐对Python写回）
+                similarity_matrix = np.where(
+                    similarity_matrix == 0.0,
+                    semantic_similarity_matrix,
+                    np.maximum(similarity_matrix, semantic_similarity_matrix)
+                )
+                np.fill_diagonal(similarity_matrix, 1.0)
+                semantic_ok = True
             except Exception as e:
                 logger.debug(f"批量语义相似度计算失败: {str(e)}，使用字符级别相似度")
                 # 继续使用字符级别相似度补充
-        
-        # 对于还没有计算相似度的位置，使用字符级别相似度
-        for i in range(n):
-            for j in range(i + 1, n):
-                if similarity_matrix[i][j] == 0.0:
-                    # 使用字符级别相似度
-                    similarity = SequenceMatcher(None, keywords[i], keywords[j]).ratio()
-                    similarity_matrix[i][j] = similarity
-                    similarity_matrix[j][i] = similarity
-        
+
+        # 语义合并成功时矩阵已无空位，字符级补充只在语义路径不可用/失败时需要
+        if not semantic_ok:
+            if RAPIDFUZZ_AVAILABLE:
+                zero_mask = similarity_matrix == 0.0
+                if zero_mask.any():
+                    # C++实现一次算出全矩阵并多核并行，只回填空缺位置
+                    char_similarity = rf_process.cdist(
+                        keywords, keywords, scorer=rf_fuzz.ratio, workers=-1
+                    ) / 100.0
+                    similarity_matrix = np.where(zero_mask, char_similarity, similarity_matrix)
+                    np.fill_diagonal(similarity_matrix, 1.0)
+            else:
+                for i in range(n):
+                    for j in range(i + 1, n):
+                        if similarity_matrix[i][j] == 0.0:
+                            # 使用字符级别相似度
+                            similarity = SequenceMatcher(None, keywords[i], keywords[j]).ratio()
+                            similarity_matrix[i][j] = similarity
+                            similarity_matrix[j][i] = similarity
+
         return similarity_matrix
     
     def _calculate_similarity(self, word1: str, word2: str) -> float:
@@ -670,12 +910,9 @@ class BERTEncoder:
         semantic_model = self._get_semantic_model()
         if semantic_model:
             try:
-                # 计算语义相似度（余弦相似度）
-                embeddings = semantic_model.encode([word1, word2], convert_to_numpy=True)
-                # 计算余弦相似度
-                similarity = np.dot(embeddings[0], embeddings[1]) / (
-                    np.linalg.norm(embeddings[0]) * np.linalg.norm(embeddings[1])
-                )
+                # 计算语义相似度（向量走关键词缓存且已归一化，点积即余弦相似度）
+                embeddings = self._encode_keywords([word1, word2])
+                similarity = np.dot(embeddings[0], embeddings[1])
                 # 将余弦相似度（范围通常为-1到1）归一化到0-1范围
                 # 由于embedding通常相似度在0-1之间，这里直接使用，如果小于0则设为0
                 semantic_similarity = max(0.0, similarity)
@@ -683,9 +920,10 @@ class BERTEncoder:
             except Exception as e:
                 logger.debug(f"语义相似度计算失败: {str(e)}，使用字符级别相似度")
         
-        # 回退到字符级别相似度（使用序列匹配）
-        similarity = SequenceMatcher(None, word1, word2).ratio()
-        return similarity
+        # 回退到字符级别相似度（优先rapidfuzz的C++实现）
+        if RAPIDFUZZ_AVAILABLE:
+            return rf_fuzz.ratio(word1, word2) / 100.0
+        return SequenceMatcher(None, word1, word2).ratio()
     
     def _choose_representative(self, cluster: List[str]) -> str:
         """
@@ -701,9 +939,8 @@ class BERTEncoder:
             return cluster[0]
         
         # 优先选择较短的词（通常更简洁）
-        # 如果长度相同，选择第一个
-        cluster_sorted = sorted(cluster, key=lambda x: (len(x), x))
-        return cluster_sorted[0]
+        # 如果长度相同，选择字典序最小的（min为O(k)，无需整体排序）
+        return min(cluster, key=lambda x: (len(x), x))
     
     def batch_encode_media(self, media_info_dict: Dict[str, Dict]) -> Dict[str, Dict]:
         """
@@ -745,17 +982,46 @@ class BERTEncoder:
         # 第二步：对每个字段的所有关键词进行全局聚类（计算相似性矩阵）
         # 将set转换为list并排序，确保顺序一致
         all_keywords_list = {}
+        self._global_field_map = {}
         for field in fields_to_encode:
-            keywords_list = sorted(list(all_original_keywords[field]))
-            all_keywords_list[field] = keywords_list
-            
-            if keywords_list:
-                # 对全局关键词进行聚类分析（这会计算并保存相似性矩阵）
-                logger.info(f"对字段 {field} 的 {len(keywords_list)} 个全局关键词进行聚类分析")
-                # 应用特殊规则
-                keywords_after_rules = self._apply_special_rules(field, keywords_list.copy())
-                # 全局聚类（会保存相似性矩阵）
-                _ = self._cluster_by_similarity(keywords_after_rules, field_name=field)
+            all_keywords_list[field] = sorted(all_original_keywords[field])
+
+        def _cluster_field(field: str):
+            keywords_list = all_keywords_list[field]
+            # 对全局关键词进行聚类分析（这会计算并保存相似性矩阵）
+            logger.info(f"对字段 {field} 的 {len(keywords_list)} 个全局关键词进行聚类分析")
+            # 应用特殊规则
+            keywords_after_rules = self._apply_special_rules(field, keywords_list.copy())
+            # 全局聚类（会保存相似性矩阵）
+            _ = self._cluster_by_similarity(keywords_after_rules, field_name=field)
+
+            # 根据聚类详情构建"原始关键词->最终代表词"的全局映射，
+            # 后续逐媒体的encode_field只需查一次字典，不再重复规则/聚类
+            with BERTEncoder._stats_lock:
+                field_stats = self.last_clustering_stats['fields'].get(field, {})
+            rep_map = {}
+            for cluster_info in field_stats.get('clusters', []):
+                rep = cluster_info.get('representative')
+                for member in cluster_info.get('members', []):
+                    rep_map[member] = rep
+                rep_map[rep] = rep
+            self._global_field_map[field] = {
+                orig: rep_map.get(after_rule, after_rule)
+                for orig, after_rule in zip(keywords_list, keywords_after_rules)
+            }
+
+        # 各字段的聚类彼此独立，且耗时集中在encode前向和BLAS矩阵乘（都会释放GIL），
+        # CPU上用线程池并行；GPU上并行只会让encode串行排队，保持顺序执行
+        active_fields = [f for f in fields_to_encode if all_keywords_list[f]]
+        if len(active_fields) > 1 and not BERTEncoder._model_on_gpu:
+            with ThreadPoolExecutor(
+                max_workers=min(len(active_fields), os.cpu_count() or 4),
+                thread_name_prefix='FieldCluster'
+            ) as executor:
+                list(executor.map(_cluster_field, active_fields))
+        else:
+            for field in active_fields:
+                _cluster_field(field)
         
         # 第三步：编码每个媒体，使用全局聚类结果
         encoded_dict = {}
@@ -852,39 +1118,49 @@ class BERTEncoder:
         fields = ['ownership', 'funding', 'political_stance',
                  'content_domain', 'location', 'target_audience', 'category']
         
+        # 单次遍历媒体字典同时更新全部字段的集合（原先按字段×媒体嵌套遍历7遍）
+        original_sets = {field: set() for field in fields}
+        encoded_sets = {field: set() for field in fields}
+
+        for media_info in media_info_dict.values():
+            for field in fields:
+                value = media_info.get(field)
+                if value:
+                    original_sets[field].update(k.strip() for k in value.split('/'))
+
+        for media_info in encoded_dict.values():
+            for field in fields:
+                value = media_info.get(field)
+                if value:
+                    encoded_sets[field].update(k.strip() for k in value.split('/'))
+
         stats = {}
         for field in fields:
-            original_set = set()
-            encoded_set = set()
-            
-            for media_info in media_info_dict.values():
-                if field in media_info and media_info[field]:
-                    keywords = [k.strip() for k in media_info[field].split('/')]
-                    original_set.update(keywords)
-            
-            for media_info in encoded_dict.values():
-                if field in media_info and media_info[field]:
-                    keywords = [k.strip() for k in media_info[field].split('/')]
-                    encoded_set.update(keywords)
-            
+            original_count = len(original_sets[field])
+            encoded_count = len(encoded_sets[field])
             stats[field] = {
-                'original_count': len(original_set),
-                'encoded_count': len(encoded_set),
-                'reduction': len(original_set) - len(encoded_set),
-                'reduction_rate': (len(original_set) - len(encoded_set)) / len(original_set) * 100 if original_set else 0
+                'original_count': original_count,
+                'encoded_count': encoded_count,
+                'reduction': original_count - encoded_count,
+                'reduction_rate': (original_count - encoded_count) / original_count * 100 if original_count else 0
             }
-        
+
         return stats
     
     def _load_record(self):
         """从文件加载编码记录"""
         try:
             if os.path.exists(self.record_file):
-                with open(self.record_file, 'r', encoding='utf-8') as f:
-                    record_data = json.load(f)
-                    self.encoding_mapping = record_data.get('encoding_mapping', {})
-                    self.last_clustering_stats = record_data.get('last_clustering_stats', None)
-                    logger.info(f"已加载BERT编码记录: {self.record_file}")
+                if orjson is not None:
+                    with open(self.record_file, 'rb') as f:
+                        record_data = orjson.loads(f.read())
+                else:
+                    with open(self.record_file, 'r', encoding='utf-8') as f:
+                        record_data = json.load(f)
+                self.encoding_mapping = record_data.get('encoding_mapping', {})
+                self.last_clustering_stats = record_data.get('last_clustering_stats', None)
+                self._attach_matrices()
+                logger.info(f"已加载BERT编码记录: {self.record_file}")
             else:
                 logger.info("BERT编码记录文件不存在，将创建新记录")
                 self.encoding_mapping = {}
@@ -893,7 +1169,23 @@ class BERTEncoder:
             logger.error(f"加载BERT编码记录失败: {str(e)}")
             self.encoding_mapping = {}
             self.last_clustering_stats = None
-    
+
+    def _attach_matrices(self):
+        """从.npz sidecar回填相似度矩阵（sidecar缺失时保留matrix_ref占位）"""
+        if not self.last_clustering_stats:
+            return
+        matrices_file = self._matrices_file()
+        if not os.path.exists(matrices_file):
+            return
+        try:
+            with np.load(matrices_file) as matrices:
+                for field_stats in self.last_clustering_stats.get('fields', {}).values():
+                    sim = field_stats.get('similarity_matrix')
+                    if sim and sim.get('matrix_ref') in matrices.files:
+                        sim['matrix'] = matrices[sim.pop('matrix_ref')]
+        except Exception as e:
+            logger.warning(f"加载相似度矩阵sidecar失败: {str(e)}")
+
     def _save_record(self):
         """保存编码记录到文件"""
         try:
@@ -902,15 +1194,25 @@ class BERTEncoder:
             if record_dir and not os.path.exists(record_dir):
                 os.makedirs(record_dir)
             
+            matrices: Dict[str, np.ndarray] = {}
             record_data = {
                 'encoding_mapping': self.encoding_mapping,
-                'last_clustering_stats': self.last_clustering_stats,
+                'last_clustering_stats': self._stats_for_disk(matrices),
                 'updated_at': datetime.now().isoformat()
             }
-            
-            with open(self.record_file, 'w', encoding='utf-8') as f:
-                json.dump(record_data, f, ensure_ascii=False, indent=2)
-            
+
+            # 优先使用orjson序列化（C实现，UTF-8直出，无需逐字符转义判断）
+            if orjson is not None:
+                with open(self.record_file, 'wb') as f:
+                    f.write(orjson.dumps(record_data, option=orjson.OPT_INDENT_2))
+            else:
+                with open(self.record_file, 'w', encoding='utf-8') as f:
+                    json.dump(record_data, f, ensure_ascii=False, indent=2)
+
+            # 相似度矩阵单独写入.npz（FP16压缩存储，单次C调用读写）
+            if matrices:
+                np.savez_compressed(self._matrices_file(), **matrices)
+
             logger.info(f"已保存BERT编码记录: {self.record_file}")
         except Exception as e:
             logger.error(f"保存BERT编码记录失败: {str(e)}")
@@ -924,10 +1226,17 @@ class BERTEncoder:
         """
         return {
             'encoding_mapping': self.encoding_mapping,
-            'last_clustering_stats': self.last_clustering_stats,
+            'last_clustering_stats': self._stats_for_json(),
             'similarity_threshold': self.similarity_threshold
         }
 
 
 # 全局编码器实例
 bert_encoder = BERTEncoder()
+
+# 全局编码合批器：任务队列工作线程的并发编码请求在此合并为单次前向
+encoder_batcher = EncoderBatcher(
+    lambda texts: bert_encoder.simple_encode(
+        texts, convert_to_numpy=True, normalize_embeddings=True
+    )
+)
@@ -1,6 +1,7 @@
 """任务队列系统"""
 import threading
-import queue
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Optional, Callable
 from datetime import datetime
 from enum import Enum
@@ -57,12 +58,14 @@ class TaskQueue:
     
     def __init__(self, max_workers: int = 3):
         self.tasks: Dict[str, Task] = {}  # 所有任务
-        self.task_queue = queue.Queue()   # 待处理任务队列
         self.max_workers = max_workers
-        self.workers = []
         self.handlers: Dict[str, Callable] = {}  # 任务处理器
         self.running = False
         self.lock = threading.Lock()
+        # 工作线程池（空闲时线程在条件变量上休眠，无轮询开销）
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # start()之前提交的任务暂存于此，启动时统一派发
+        self._pending = deque()
     
     def register_handler(self, task_type: str, handler: Callable):
         """
@@ -88,11 +91,14 @@ class TaskQueue:
             Task对象
         """
         task = Task(task_id, task_type, params)
-        
+
         with self.lock:
             self.tasks[task_id] = task
-            self.task_queue.put(task)
-        
+            if self.running:
+                self._executor.submit(self._run_task, task)
+            else:
+                self._pending.append(task)
+
         logger.info(f"任务已提交: {task_id} ({task_type})")
         return task
     
@@ -100,49 +106,50 @@ class TaskQueue:
         """获取任务"""
         return self.tasks.get(task_id)
     
+    def get_tasks(self, task_ids) -> Dict[str, Task]:
+        """批量获取任务：单次加锁查完所有ID，避免逐个调用的锁开销"""
+        with self.lock:
+            return {
+                task_id: self.tasks[task_id]
+                for task_id in task_ids if task_id in self.tasks
+            }
+
     def get_all_tasks(self) -> list:
         """获取所有任务"""
         with self.lock:
             return list(self.tasks.values())
     
     def start(self):
-        """启动工作线程"""
-        if self.running:
-            return
-        
-        self.running = True
-        for i in range(self.max_workers):
-            worker = threading.Thread(
-                target=self._worker,
-                name=f"TaskWorker-{i}",
-                daemon=True
+        """启动工作线程池并派发已暂存的任务"""
+        with self.lock:
+            if self.running:
+                return
+
+            self.running = True
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix='TaskWorker'
             )
-            worker.start()
-            self.workers.append(worker)
-        
+            while self._pending:
+                self._executor.submit(self._run_task, self._pending.popleft())
+
         logger.info(f"任务队列已启动，工作线程数: {self.max_workers}")
-    
+
     def stop(self):
-        """停止工作线程"""
-        self.running = False
+        """停止工作线程池（不等待在途任务）"""
+        with self.lock:
+            self.running = False
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
         logger.info("任务队列已停止")
-    
-    def _worker(self):
-        """工作线程"""
-        while self.running:
-            try:
-                # 获取任务，超时1秒
-                task = self.task_queue.get(timeout=1)
-                
-                # 处理任务
-                self._process_task(task)
-                
-                self.task_queue.task_done()
-                
-            except queue.Empty:
-                continue
-            except Exception as e:
-                logger.error(f"工作线程错误: {str(e)}")
+
+    def _run_task(self, task: Task):
+        """线程池工作单元：处理单个任务并兜底记录异常"""
+        try:
+            self._process_task(task)
+        except Exception as e:
+            logger.error(f"工作线程错误: {str(e)}")
     
     def _process_task(self, task: Task):
         """
@@ -1,72 +1,136 @@
-import string
+import re
+from collections import OrderedDict
+from functools import lru_cache
+
 import jieba
-from sentence_transformers import util
-from app.core.bert_encoder import bert_encoder
+import numpy as np
+from app.core.bert_encoder import encoder_batcher
+
+# 导入时预热jieba词典，首个搜索请求不再承担词典加载开销
+jieba.initialize()
+
+# 去标点用的预编译正则：删除中文、英文字母、数字、空格以外的字符
+# （C层单次扫描，替代逐字符的Python集合查找）
+_PUNCT_RE = re.compile('[^0-9A-Za-z\\u4e00-\\u9fff ]+')
+
+# 通用停用词（中英文通用虚词/无意义词，已全部小写，查表前无需再转换）
+_STOPWORDS = frozenset({
+    # 中文停用词
+    '的', '了', '在', '是', '我', '有', '和', '就', '不', '人', '都', '一', '一个', '上', '也',
+    '到', '说', '要', '去', '你', '会', '着', '没有', '看', '好', '自己', '这', '但', '而',
+    # 英文停用词
+    'the', 'a', 'an', 'and', 'or', 'but', 'is', 'are', 'was', 'were', 'in', 'on', 'at', 'to', 'of', 'for',
+    'with', 'as', 'by', 'i', 'you', 'he', 'she', 'it', 'we', 'they', 'me', 'him', 'her', 'us', 'them'
+})
+
+
+@lru_cache(maxsize=20000)
+def _preprocess_mixed_text(text):
+    """
+    处理中英文混杂文本的预处理（结果按原文LRU缓存，重复标题不再走jieba分词）
+    步骤：去标点 → 中文分词 → 过滤停用词 → 保留英文原词（按空格拆分）
+    """
+    if not text.strip():
+        return ""
+
+    # 1. 去除标点符号（保留字母、数字、中文、空格）
+    text_clean = _PUNCT_RE.sub('', text)
+
+    # 2. 中文分词（英文按空格拆分，不额外处理）
+    # 使用jieba分词，同时保留英文单词（通过cut_all=False确保精度）
+    tokens = jieba.cut(text_clean, cut_all=False)
+
+    # 3. 过滤停用词和空字符（单个推导式，省去逐token的append调用）
+    filtered_tokens = [
+        token for token in (t.strip() for t in tokens)
+        if token and token.lower() not in _STOPWORDS  # 忽略大小写判断停用词
+    ]
+
+    # 4. 用空格拼接 tokens（模型输入需字符串格式）
+    return ' '.join(filtered_tokens)
 
 
 class TextMatcher:
+
+    # 嵌入向量LRU缓存容量（重复查询/轮询中反复出现的标题无需再次前向计算）
+    EMBEDDING_CACHE_SIZE = 4096
+
     def __init__(self):
         # 加载多语言预训练模型（支持中英混杂文本）
         # self.model = self.model = SentenceTransformer('paraphrase-multilingual-MiniLM-L12-v2')  # Not a good practice. Instead use the global bert_encoder instance.
 
-        # 通用停用词（中英文通用虚词/无意义词）
-        self.stopwords = {
-            # 中文停用词
-            '的', '了', '在', '是', '我', '有', '和', '就', '不', '人', '都', '一', '一个', '上', '也',
-            '到', '说', '要', '去', '你', '会', '着', '没有', '看', '好', '自己', '这', '但', '而',
-            # 英文停用词
-            'the', 'a', 'an', 'and', 'or', 'but', 'is', 'are', 'was', 'were', 'in', 'on', 'at', 'to', 'of', 'for',
-            'with', 'as', 'by', 'i', 'you', 'he', 'she', 'it', 'we', 'they', 'me', 'him', 'her', 'us', 'them'
-        }
+        # 嵌入向量缓存：{预处理后的文本: 向量}，LRU淘汰
+        self._embedding_cache: OrderedDict = OrderedDict()
 
-    def _preprocess_mixed_text(self, text):
+    def _embed_batch(self, texts):
         """
-        处理中英文混杂文本的预处理
-        步骤：去标点 → 中文分词 → 过滤停用词 → 保留英文原词（按空格拆分）
+        批量获取文本的语义向量，优先命中缓存，仅对未命中的文本调用模型
+        :param texts: 预处理后的文本列表
+        :return: 向量矩阵 (len(texts), 特征维度) 的 np.ndarray
         """
-        if not text.strip():
-            return ""
+        # 收集未命中的文本（去重，保持顺序）
+        missing = []
+        for text in texts:
+            if text not in self._embedding_cache and text not in missing:
+                missing.append(text)
 
-        # 1. 去除标点符号（保留字母、数字、中文）
-        # 构建允许保留的字符集：中文、英文、数字、空格
-        allowed_chars = set(
-            string.ascii_letters + string.digits + ' ' + ''.join([chr(c) for c in range(0x4e00, 0x9fff + 1)]))
-        text_clean = ''.join([c for c in text if c in allowed_chars])
+        # 只对未命中的文本做前向计算（归一化融合进前向，余弦相似度退化为点积）
+        # 经合批器提交：多个任务线程的并发请求会合并为一次模型前向
+        if missing:
+            embeddings = encoder_batcher.encode(missing)
+            for text, embedding in zip(missing, np.asarray(embeddings)):
+                self._embedding_cache[text] = embedding
+            # LRU淘汰最久未使用的条目
+            while len(self._embedding_cache) > self.EMBEDDING_CACHE_SIZE:
+                self._embedding_cache.popitem(last=False)
 
-        # 2. 中文分词（英文按空格拆分，不额外处理）
-        # 使用jieba分词，同时保留英文单词（通过cut_all=False确保精度）
-        tokens = jieba.cut(text_clean, cut_all=False)
+        vectors = []
+        for text in texts:
+            self._embedding_cache.move_to_end(text)
+            vectors.append(self._embedding_cache[text])
+        return np.stack(vectors)
 
-        # 3. 过滤停用词和空字符
-        filtered_tokens = []
-        for token in tokens:
-            token = token.strip()
-            if token and token.lower() not in self.stopwords:  # 忽略大小写判断停用词
-                filtered_tokens.append(token)
+    def _preprocess_mixed_text(self, text):
+        """预处理入口（委托模块级缓存函数，见 _preprocess_mixed_text）"""
+        return _preprocess_mixed_text(text)
 
-        # 4. 用空格拼接 tokens（模型输入需字符串格式）
-        return ' '.join(filtered_tokens)
+    def embed_query(self, event_text):
+        """
+        预先计算事件文本的语义向量，供多次 calculate_similarity 调用复用
+        :param event_text: 用户输入的事件（可混杂中英文）
+        :return: 查询向量 (1, 特征维度) 的 np.ndarray
+        """
+        processed_event = self._preprocess_mixed_text(event_text)
+        processed_event = processed_event if processed_event else "空文本"
+        return self._embed_batch([processed_event])
 
     def calculate_similarity(self, event_text, news_titles):
         """
         计算事件文本与新闻标题的相似度（支持中英文混杂）
-        :param event_text: 用户输入的事件（可混杂中英文）
+        :param event_text: 用户输入的事件（可混杂中英文），或 embed_query 预计算的查询向量
         :param news_titles: 新闻标题列表（可混杂中英文）
-        :return: 相似度列表（0~1，值越高关联度越强）
+        :return: 相似度数组 np.ndarray（0~1，值越高关联度越强）
         """
-        # 1. 预处理所有文本（事件+标题）
-        processed_event = self._preprocess_mixed_text(event_text)
-        processed_titles = [self._preprocess_mixed_text(title) for title in news_titles]
+        # 0. 空标题列表直接返回，不加载/调用模型
+        if not news_titles:
+            return np.empty(0)
 
-        # 2. 处理空文本（避免模型编码报错）
-        processed_event = processed_event if processed_event else "空文本"
+        # 1. 预处理标题并处理空文本（避免模型编码报错）
+        processed_titles = [self._preprocess_mixed_text(title) for title in news_titles]
         processed_titles = [title if title else "空文本" for title in processed_titles]
 
-        # 3. 用多语言模型将文本转为语义向量
-        event_embedding = bert_encoder.simple_encode(processed_event, convert_to_tensor=True)
-        title_embeddings = bert_encoder.simple_encode(processed_titles, convert_to_tensor=True)
+        # 2. 获取查询向量和标题向量（查询未预计算时并入同一批前向，减少一次模型调用）
+        if isinstance(event_text, np.ndarray):
+            event_embedding = event_text
+            title_embeddings = self._embed_batch(processed_titles)
+        else:
+            processed_event = self._preprocess_mixed_text(event_text)
+            processed_event = processed_event if processed_event else "空文本"
+            all_embeddings = self._embed_batch([processed_event] + processed_titles)
+            event_embedding = all_embeddings[:1]
+            title_embeddings = all_embeddings[1:]
 
-        # 4. 计算余弦相似度（语义层面的匹配，而非字面匹配）
-        similarities = util.cos_sim(event_embedding, title_embeddings).flatten().tolist()
+        # 3. 计算余弦相似度（向量已归一化，点积即余弦，无需cos_sim再算范数）
+        similarities = (event_embedding @ title_embeddings.T).flatten()
 
-        return similarities
\ No newline at end of file
+        return np.asarray(similarities)
\ No newline at end of file
@@ -1,7 +1,7 @@
 from datetime import datetime
 from collections import defaultdict
 from typing import List, Dict, Optional
-from scipy.spatial.distance import cdist
+from joblib import Memory
 from app.core.bert_encoder import bert_encoder
 # from sklearn.preprocessing import RobustScaler
 from sklearn.cluster import AgglomerativeClustering, HDBSCAN
@@ -11,6 +11,40 @@ import numpy as np
 
 logger = logging.getLogger(__name__)
 
+# Optional GPU clustering: cuML's HDBSCAN is a drop-in replacement that runs
+# the whole fit on-device; fall back to sklearn on CPU-only machines
+try:
+    from cuml.cluster import HDBSCAN as cuHDBSCAN
+    import cupy as cp
+    CUML_AVAILABLE = True
+except ImportError:
+    CUML_AVAILABLE = False
+
+# Disk-backed memoization of clustering runs: regenerating a timeline for the
+# same article set (same embeddings, same threshold) skips HDBSCAN entirely.
+# joblib hashes the ndarray argument, so the key is content-based.
+_cluster_memory = Memory(location='./.cache/hdbscan', verbose=0)
+
+
+@_cluster_memory.cache
+def _cluster_articles(X_final: np.ndarray, distance_threshold: float) -> np.ndarray:
+    if CUML_AVAILABLE:
+        clusterer = cuHDBSCAN(
+            min_cluster_size=2,
+            cluster_selection_epsilon=distance_threshold,
+            cluster_selection_method='eom'
+        )
+        # Downstream centroid math stays on CPU
+        return cp.asnumpy(clusterer.fit_predict(cp.asarray(X_final)))
+    clusterer = HDBSCAN(
+        metric='euclidean',
+        min_cluster_size=2,
+        cluster_selection_epsilon=distance_threshold,
+        cluster_selection_method='eom',
+        n_jobs=-1
+    )
+    return clusterer.fit_predict(X_final)
+
 
 class TimelineGenerator:
 
@@ -35,18 +69,32 @@ class TimelineGenerator:
         X_semantics = bert_encoder.encode_docs(articles_info)  # [N, features_num]
 
         # -- Convert timestamps into time features --
-        timestamps = [datetime.fromisoformat(a.get('published_at', '').rstrip('Z')) for a in articles]
+        # published_at may be missing; such articles fall back to the earliest known time
+        timestamps = [
+            datetime.fromisoformat(p.rstrip('Z')) if p else None
+            for p in (a.get('published_at') for a in articles)
+        ]
+        known_times = [t for t in timestamps if t is not None]
         # Find earliest timestamp as reference
-        min_time = min(timestamps)
-        # Convert each timestamp to hours since the reference point
-        time_features = np.array([[(t - min_time).total_seconds() / 3600.] for t in timestamps]) # [N, 1]
-        # time_scaler = RobustScaler()
-        # time_features_scaled = time_scaler.fit_transform(time_features)
-        # time_features_weighted = time_features_scaled * self.time_weight
-        time_features_weighted = time_features * self.time_weight
+        min_time = min(known_times) if known_times else datetime.now()
+        # Hours since the reference point; +inf marks missing timestamps so they
+        # never win the per-cluster earliest-article argmin below
+        hours_since_min = np.array([
+            (t - min_time).total_seconds() / 3600. if t is not None else np.inf
+            for t in timestamps
+        ])
         # -----
 
-        X_final = np.concatenate([X_semantics, time_features_weighted], axis=1)  # [N, features_num+1]
+        # Fuse semantic and time features into one preallocated float32 matrix,
+        # writing both blocks in place instead of allocating intermediate
+        # weighted/concatenated copies (the distance scan is memory-bound)
+        N, D = X_semantics.shape
+        X_final = np.empty((N, D + 1), dtype=np.float32)  # [N, features_num+1]
+        X_final[:, :D] = X_semantics
+        # time_scaler = RobustScaler()
+        # time_features_scaled = time_scaler.fit_transform(hours_since_min[:, None])
+        # Missing timestamps fall back to the reference point for the time feature
+        X_final[:, D] = np.where(np.isfinite(hours_since_min), hours_since_min, 0.) * self.time_weight
 
         # Test: euclidean distance matrix
         # dist_matrix = cdist(X_final, X_final)  # [N, N]
@@ -67,24 +115,28 @@ class TimelineGenerator:
         #     linkage='average',
         #     distance_threshold=self.distance_threshold
         # )
-        clusterer = HDBSCAN(
-            metric='euclidean',
-            min_cluster_size=2,
-            cluster_selection_epsilon=self.distance_threshold,
-            cluster_selection_method='eom',
-            n_jobs=-1
-        )
-        cluster_labels = clusterer.fit_predict(X_final)
-
-        clusters_info = defaultdict(lambda: {'a': [], 'e': [], 'i': []}) # 'a': articles, 'e': embeddings, 'i': indices
-        for index, label in enumerate(cluster_labels):
-            if label == -1:  # For HDBSCAN specifically, -1 means outliers
-                continue
+        cluster_labels = _cluster_articles(X_final, self.distance_threshold)
+
+        # Representative article of every cluster in one vectorized pass:
+        # all centroids via a single scatter-add, all member-to-centroid
+        # distances via a single norm, instead of a mean + cdist per cluster
+        representative_of = {}
+        member_indices = np.flatnonzero(cluster_labels != -1)  # -1 means outliers for HDBSCAN
+        if member_indices.size:
+            unique_labels, inverse = np.unique(cluster_labels[member_indices], return_inverse=True)
+            sums = np.zeros((unique_labels.size, X_final.shape[1]))
+            np.add.at(sums, inverse, X_final[member_indices])
+            centroids = sums / np.bincount(inverse)[:, None]
+            dists = np.linalg.norm(X_final[member_indices] - centroids[inverse], axis=1)
+            for pos, label in enumerate(unique_labels):
+                members = np.flatnonzero(inverse == pos)
+                representative_of[label] = member_indices[members[np.argmin(dists[members])]]
+
+        clusters_info = defaultdict(lambda: {'a': [], 'i': []}) # 'a': articles, 'i': indices
+        for index in member_indices:
             # index: also index of articles; label: each article belongs to
-            # Append the article, its embedding and index
-            clusters_info[label]['a'].append(articles[index])
-            clusters_info[label]['e'].append(X_final[index])
-            clusters_info[label]['i'].append(index)
+            clusters_info[cluster_labels[index]]['a'].append(articles[index])
+            clusters_info[cluster_labels[index]]['i'].append(index)
 
         timeline_nodes = []
         for label, info in clusters_info.items():
@@ -92,16 +144,12 @@ class TimelineGenerator:
             if len(info['a']) < self.members_threshold:
                 continue
 
-            # Find representative article of a cluster
-            centroid = np.mean(info['e'], axis=0)  # (features_num,)
-            distances = cdist(centroid.reshape((1, -1)) , info['e'])  # (1, features_num), (members_num, features_num)
-            representative_inner_index = np.argmin(distances)
-            representative_index = info['i'][representative_inner_index]
-            representative_article = articles[representative_index]
+            # Representative article was precomputed in the vectorized pass above
+            representative_article = articles[representative_of[label]]
 
-            # Find earliest article of a cluster
-            max_datetime_str = str(datetime.max)
-            earliest_article = min(info['a'], key=lambda a: a.get('published_at', max_datetime_str))
+            # Find earliest article of a cluster via argmin on pre-parsed hours
+            # (no per-cluster date-string comparisons or dict lookups)
+            earliest_article = info['a'][int(np.argmin(hours_since_min[info['i']]))]
             
             key_event_timestamp = earliest_article.get('published_at')  # TODO: Handle None
             key_event_title = representative_article.get('title', '')
@@ -121,7 +169,14 @@ class TimelineGenerator:
                 'source_articles': source_articles,
             })
         
-        timeline_nodes.sort(key=lambda node: node['timestamp'], reverse=True)
+        # Newest first; ISO strings compare lexically, None (empty key) sorts last.
+        # argsort on a numpy string array keeps comparisons in C instead of
+        # calling a Python key lambda per comparison
+        if timeline_nodes:
+            order = np.argsort(
+                np.array([node['timestamp'] or '' for node in timeline_nodes])
+            )[::-1]
+            timeline_nodes = [timeline_nodes[i] for i in order]
         logger.info(f'Task{task_id}: A timeline with {len(timeline_nodes)} nodes is generated.')
 
         return timeline_nodes
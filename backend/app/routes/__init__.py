@@ -1,8 +1,32 @@
 """API路由模块"""
-from flask import Blueprint
+from flask import Blueprint, Response, jsonify
+
+# 尝试导入 orjson，如果失败则回退到标准 jsonify（orjson 对大响应体快数倍）
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 api_bp = Blueprint('api', __name__)
 
+
+def json_response(payload, status: int = 200):
+    """
+    构造JSON响应，优先使用orjson序列化
+
+    Args:
+        payload: 可序列化的响应内容
+        status: HTTP状态码
+
+    Returns:
+        Flask Response对象
+    """
+    if orjson is None:
+        response = jsonify(payload)
+        response.status_code = status
+        return response
+    return Response(orjson.dumps(payload), status=status, mimetype='application/json')
+
 # 导入路由
 from app.routes import events
 from app.routes import sentiment
@@ -1,7 +1,7 @@
 """事件相关API接口"""
 from flask import jsonify, request
-from app.routes import api_bp
-from app.services.event_service import event_service
+from app.routes import api_bp, json_response
+from app.services.event_service import get_event_service
 from app.core.bert_encoder import bert_encoder
 
 
@@ -28,7 +28,7 @@ def search_events():
     region = data.get('region', 'CN')
     
     # 提交搜索任务到队列
-    result = event_service.submit_search_task(
+    result = get_event_service().submit_search_task(
         query=query,
         language=language,
         region=region
@@ -44,7 +44,7 @@ def get_events():
     返回所有已缓存的事件
     """
     try:
-        events = event_service.get_all_events()
+        events = get_event_service().get_all_events()
         
         # 按创建时间排序
         events.sort(
@@ -52,7 +52,8 @@ def get_events():
             reverse=True
         )
         
-        return jsonify({
+        # 事件列表响应体较大，使用orjson（可用时）加速序列化
+        return json_response({
             'success': True,
             'data': {
                 'events': events,
@@ -76,7 +77,7 @@ def get_event_detail(event_id):
         - event_id: 事件ID（字符串）
     """
     try:
-        event = event_service.get_event_by_id(event_id)
+        event = get_event_service().get_event_by_id(event_id)
         
         if not event:
             return jsonify({
@@ -85,7 +86,7 @@ def get_event_detail(event_id):
                 'message': f'{event_id} 事件不存在'
             }), 404
         
-        return jsonify({
+        return json_response({
             'success': True,
             'data': event,
             'message': '获取成功'
@@ -106,7 +107,7 @@ def get_task_status(task_id):
         - task_id: 任务ID
     """
     try:
-        task_status = event_service.get_task_status(task_id)
+        task_status = get_event_service().get_task_status(task_id)
         
         if not task_status:
             return jsonify({
@@ -1,11 +1,17 @@
 """事件服务 - 处理新闻聚合和事件生成"""
 from typing import List, Dict, Optional, Any
 from datetime import datetime
-from collections import defaultdict
+import atexit
+from collections import defaultdict, OrderedDict
+from functools import lru_cache
+from itertools import islice
 import hashlib
 import logging
+import sys
+import time
 import uuid
 import requests
+from requests.adapters import HTTPAdapter, Retry
 import re
 import json
 import os
@@ -26,34 +32,197 @@ from app.services.word_segmentation_service import word_segmentation_service
 
 logger = logging.getLogger(__name__)
 
+# 尝试导入 xxhash（非加密哈希，短字符串指纹比MD5快数倍），失败则回退 blake2b
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+
+# 尝试导入 orjson 加速媒体缓存文件的读写，未安装时回退标准库 json
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# SimHash标题分词用的预编译正则
+_TOKEN_RE = re.compile(r'\w+')
+
+# AI媒体分析回复的字段解析：七个模式融合为一个交替式，模块加载时编译一次，
+# 单趟finditer扫描全文替代七次re.search
+_MEDIA_FIELD_RE = re.compile(r'(所有制|资金来源|政治立场|内容领域|地理位置|目标受众|媒体类别)[:：]\s*(.+)')
+_MEDIA_FIELD_KEYS = {
+    '所有制': 'ownership',
+    '资金来源': 'funding',
+    '政治立场': 'political_stance',
+    '内容领域': 'content_domain',
+    '地理位置': 'location',
+    '目标受众': 'target_audience',
+    '媒体类别': 'category',
+}
+
+
+def _hash_token_64(token: str) -> int:
+    """计算token的64位哈希（优先xxhash，回退内置hash截断）"""
+    if XXHASH_AVAILABLE:
+        return xxhash.xxh64_intdigest(token)
+    return hash(token) & 0xFFFFFFFFFFFFFFFF
+
+
+def _simhash64(text: str) -> int:
+    """
+    计算文本的64位SimHash指纹
+
+    对分词后的token逐位投票：近似重复的文本（转载标题的措辞微调）
+    得到汉明距离很小的指纹，可据此合并
+    """
+    tokens = _TOKEN_RE.findall(text.lower())
+    if not tokens:
+        return 0
+    votes = [0] * 64
+    for token in tokens:
+        h = _hash_token_64(token)
+        for bit in range(64):
+            votes[bit] += 1 if (h >> bit) & 1 else -1
+    fingerprint = 0
+    for bit in range(64):
+        if votes[bit] > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+@lru_cache(maxsize=4096)
+def _event_id_for(query: str, day: str) -> str:
+    """生成(查询, 日期)对应的事件ID（结果memoize，重复查询不再重新哈希）"""
+    unique_string = f"{day}_{query}".encode()
+    if XXHASH_AVAILABLE:
+        return xxhash.xxh128(unique_string).hexdigest()[:12]
+    # blake2b（短摘要）在CPython中同样比MD5快
+    return hashlib.blake2b(unique_string, digest_size=8).hexdigest()[:12]
+
+
+_MISSING = object()
+
+
+class LRUTTLCache:
+    """
+    容量+过期时间双重限制的内存缓存（dict风格接口，线程安全）
+
+    事件/文章缓存原先随查询量无限增长；改为LRU淘汰+TTL过期后，
+    常驻内存由访问热度决定而非历史总量。只实现事件服务用到的子集。
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600.0):
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._data: OrderedDict = OrderedDict()  # key -> (过期时刻, 值)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self._ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self._maxsize:
+                self._data.popitem(last=False)
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self):
+        return len(self._data)
+
+    def values(self) -> list:
+        """返回所有未过期的值（顺带清理过期条目）"""
+        now = time.monotonic()
+        with self._lock:
+            expired = [k for k, (expires_at, _) in self._data.items() if expires_at < now]
+            for key in expired:
+                del self._data[key]
+            return [value for _, value in self._data.values()]
+
 
 class EventService:
     """事件服务 - 负责新闻聚合和事件生成"""
-    
+
+    # 事件标题模板（%格式化复用同一字面量，高QPS下不重复构造f-string前后缀）
+    _TITLE_FMT = '关于"%s"的新闻聚合'
+    # 默认分类（类常量按引用复用，避免每个事件各持一份字符串对象）
+    _DEFAULT_CATEGORY = '综合'
+    # 媒体缓存落盘格式版本：与当前一致时热启动跳过整缓存BERT重编码
+    _MEDIA_CACHE_SCHEMA = 1
+
     def __init__(self):
         # 初始化聚合器并注册数据源
         self._init_sources()
-        # 简单的内存存储
-        self.events_cache = {}
-        self.articles_cache = {}
+        # 内存存储：LRU+TTL限界，防止长时间运行后无限增长
+        self.events_cache = LRUTTLCache(
+            maxsize=Config.EVENTS_CACHE_MAX, ttl=Config.EVENTS_CACHE_TTL)
+        self.articles_cache = LRUTTLCache(
+            maxsize=Config.EVENTS_CACHE_MAX, ttl=Config.EVENTS_CACHE_TTL)
         # 媒体信息缓存，避免重复分析同一媒体
         self.media_info_cache = {}
+        # 失败结果的短时负缓存：分析超时/限流的媒体60秒内不再重试，
+        # 避免同一任务里同媒体的文章逐篇撞同一个故障接口
+        self._media_negative_cache = LRUTTLCache(maxsize=1024, ttl=60.0)
+        # 在途（处理中）事件ID集合：轮询只需触达这些事件
+        self._processing_event_ids = set()
         # 缓存锁，保证线程安全
         self.cache_lock = threading.Lock()
+        # 媒体缓存文件锁（追加日志与全量重写互斥）
+        self._media_file_lock = threading.Lock()
+        # 复用的HTTP会话：连接池跨线程保持TCP+TLS连接，
+        # 并发调用AI接口时省去逐请求的握手往返
+        self._http = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=32,
+            pool_maxsize=32,
+            max_retries=Retry(
+                total=2,
+                backoff_factor=0.2,
+                status_forcelist=[429, 500, 502, 503, 504]
+            )
+        )
+        self._http.mount('https://', adapter)
+        self._http.mount('http://', adapter)
+        # 媒体分析线程池常驻复用：跨搜索任务摊销线程创建/销毁开销
+        # （CPython按需懒创建工作线程，最多32个）
+        self._media_pool = ThreadPoolExecutor(
+            max_workers=32, thread_name_prefix='media')
+        atexit.register(self._media_pool.shutdown, wait=False)
         # 加载持久化的媒体缓存
         self._load_media_cache()
 
     def _init_sources(self):
-        """初始化数据源"""
+        """初始化数据源（幂等：重复构造服务时不会重复注册，避免搜索扇出翻倍）"""
         # 注册Google News数据源
-        google_news = GoogleNewsSource()
-        aggregator.register_source(google_news)
-        logger.info("数据源初始化完成")
-        
+        if not any(isinstance(s, GoogleNewsSource) for s in aggregator.sources):
+            aggregator.register_source(GoogleNewsSource())
+            logger.info("数据源初始化完成")
+
         # 注册任务处理器
-        task_queue.register_handler('search_news', self._handle_search_task)
-        
-        # 启动任务队列
+        if 'search_news' not in task_queue.handlers:
+            task_queue.register_handler('search_news', self._handle_search_task)
+
+        # 启动任务队列（start自身有running保护，可重复调用）
         task_queue.start()
         logger.info("任务队列已启动")
     
@@ -75,9 +244,29 @@ class EventService:
             任务提交结果
         """
         try:
+            # 同一查询同一天的事件ID是确定性的：缓存里已有处理中/已完成的
+            # 同名事件（未过TTL）时直接复用，不再重复排队抓取。
+            # 加锁检查，避免并发提交同一查询时重复建任务
+            event_id = self._generate_event_id(query)
+            with self.cache_lock:
+                existing = self.events_cache.get(event_id)
+                if existing is not None and existing.get('status') in ('processing', 'completed'):
+                    logger.info(f"复用已有事件: {event_id} (query={query})")
+                    return {
+                        'success': True,
+                        'data': {
+                            'task_id': existing.get('task_id'),
+                            'event_id': event_id,
+                            'status': existing['status']
+                        },
+                        'message': '已有相同查询的事件，直接复用'
+                    }
+
             # 生成任务ID
             task_id = str(uuid.uuid4())
-            
+            # 时间戳取一次快照，date与created_at保证一致
+            now_iso = datetime.now().isoformat()
+
             # 提交任务到队列
             task = task_queue.submit_task(
                 task_id=task_id,
@@ -88,26 +277,27 @@ class EventService:
                     'region': region
                 }
             )
-            
+
             # 创建初始事件（状态为处理中）
-            event_id = self._generate_event_id(query)
             initial_event = {
                 'id': event_id,
                 'task_id': task_id,
-                'title': f'关于"{query}"的新闻聚合',
+                'title': self._TITLE_FMT % query,
                 'summary': '',
                 'content': '',
-                'date': datetime.now().isoformat(),
-                'category': '综合',
+                'date': now_iso,
+                'category': self._DEFAULT_CATEGORY,
                 'source_count': 0,
                 'sources': [],
                 'tags': [],
-                'created_at': datetime.now().isoformat(),
+                'created_at': now_iso,
                 'status': 'processing',
                 'progress': task.progress
             }
             self.events_cache[event_id] = initial_event
-            
+            with self.cache_lock:
+                self._processing_event_ids.add(event_id)
+
             return {
                 'success': True,
                 'data': {
@@ -138,6 +328,9 @@ class EventService:
         query = params['query']
         language = params.get('language', 'zh-CN')
         region = params.get('region', 'CN')
+        # 任务开始时确定事件ID并贯穿始终，避免处理跨越日期变更时
+        # 结束阶段重新计算得到不同ID
+        event_id = self._generate_event_id(query)
 
         curr_prog, curr_step = 0, 1
         total_step = 7
@@ -165,9 +358,13 @@ class EventService:
         curr_prog += prog_of_single_step
         curr_step += 1
 
-        # 阶段4: 分析媒体来源
+        # 阶段4: 分析媒体来源（唯一媒体集合在此构建一次，后续消费方共用）
         update_progress(curr_prog, 100, f'步骤{curr_step}/{total_step}: 正在分析媒体来源...')
-        media_info_dict = self._analyze_sources(aggregated_articles, update_progress, curr_step, total_step)
+        unique_sources = {a.get('source', '').strip() for a in aggregated_articles}
+        unique_sources.discard('')
+        media_info_dict = self._analyze_sources(
+            aggregated_articles, update_progress, curr_step, total_step,
+            sources=unique_sources)
         curr_prog += prog_of_single_step
         curr_step += 1
 
@@ -224,6 +421,7 @@ class EventService:
             timeline_nodes,
             segmentation_result,
             ai_summary,
+            event_id,
         )
         event['status'] = 'completed'
         event['progress'] = {
@@ -232,13 +430,15 @@ class EventService:
             'message': '完成'
         }
         
-        # 更新缓存
+        # 更新缓存，并把事件移出在途集合
         self.events_cache[event['id']] = event
-        
+        with self.cache_lock:
+            self._processing_event_ids.discard(event['id'])
+
         return {
             'event_id': event['id'],
             'article_count': len(articles_with_sentiment),
-            'source_count': len(results),
+            'source_count': aggregator.get_source_count(),
             'media_analyzed': len(media_info_dict),
             'timeline': len(timeline_nodes),
         }
@@ -384,76 +584,96 @@ class EventService:
         media_info_dict: Optional[Dict[str, Dict]] = None,
         timeline_nodes=None,
         segmentation_result: Optional[Dict] = None,
-        ai_summary: Optional[str] = None
+        ai_summary: Optional[str] = None,
+        event_id: Optional[str] = None
     ) -> Dict:
         """
         从文章列表创建事件
-        
+
         Args:
             query: 搜索关键词
             articles: 文章列表
             media_info_dict: 媒体信息字典（可选）
             timeline_nodes: 时间线dict
+            event_id: 预先生成的事件ID（可选，避免跨日回滚导致ID不一致）
 
         Returns:
             事件对象
         """
-        # 生成事件ID
-        event_id = self._generate_event_id(query)
-        
+        # 近似重复的转载标题先合并，缩小后续所有遍历和事件体积
+        articles = self._dedup_articles(articles)
+
+        # 生成事件ID（未传入时才现算）
+        if event_id is None:
+            event_id = self._generate_event_id(query)
+
         # 使用AI生成的摘要，如果没有则使用第一篇文章的摘要
         summary = ""
         if ai_summary:
             summary = ai_summary
         elif articles:
-            summary = articles[0].get('summary', '')[:200]
+            summary = articles[0].get('summary') or ''
+            # 常见情况摘要本就不长，仅超限时才切片分配新字符串
+            if len(summary) > 200:
+                summary = summary[:200]
         
-        # 提取所有来源，并关联媒体信息
+        # 单次遍历同时完成：来源提取+媒体信息关联、最新日期（滚动max）、标签收集
+        # dict.get绑定为局部变量，循环内省去每次的方法查找
+        _get = dict.get
         sources = []
-        dates = []
-        for article in articles:
-            source_name = article.get('source', '')
-            published_date = article.get('published_at', '')
+        latest_date = ''
+        tags_seen = {}  # dict去重并保持首次出现顺序，标签输出稳定可复现
+        for index, article in enumerate(articles):
+            # 媒体名只有少量取值却在缓存中重复上万次，intern后共享同一对象
+            source_name = sys.intern(_get(article, 'source', '') or '')
+            published_date = _get(article, 'published_at', '')
             source_item = {
-                'title': article.get('title', ''),
-                'url': article.get('url', ''),
+                'title': _get(article, 'title', ''),
+                'url': _get(article, 'url', ''),
                 'source': source_name,
-                'published_at': article.get('published_at', ''),
+                'published_at': published_date,
                 # 添加情感分析结果
-                'sentiment_analysis': article.get('sentiment_analysis', {}),
+                'sentiment_analysis': _get(article, 'sentiment_analysis', {}),
                 # 添加过滤状态
-                'filter': article.get('filter', False)
+                'filter': _get(article, 'filter', False)
             }
 
-            if published_date:
-                dates.append(published_date)
+            # ISO日期字符串可按字典序比较，滚动取最大值即最新日期
+            if published_date and published_date > latest_date:
+                latest_date = published_date
 
             # 添加媒体信息（如果有）
             if media_info_dict and source_name in media_info_dict:
                 source_item['media_info'] = media_info_dict[source_name]
-            
+
             sources.append(source_item)
-        
-        # 提取标签（从所有文章中）
-        tags = self._extract_tags(articles)
-        
-        # 计算日期范围
-        latest_date = max(dates) if dates else datetime.now().isoformat()
-        
+
+            # 提取标签（只从前5篇文章提取，凑满10个即不再收集）
+            if index < 5 and len(tags_seen) < 10:
+                for tag in article.get('tags', ()):
+                    tags_seen.setdefault(tag, None)
+
+        tags = list(islice(tags_seen, 10))  # 最多10个标签，islice避免整集合物化
+
+        # 时间戳取一次快照：无日期文章的回退值与created_at保证一致
+        now_iso = datetime.now().isoformat()
+        if not latest_date:
+            latest_date = now_iso
+
         # 计算情感统计
         sentiment_stats = self._calculate_sentiment_stats(articles)
         
         event = {
             'id': event_id,
-            'title': f'关于"{query}"的新闻聚合',
+            'title': self._TITLE_FMT % query,
             'summary': summary,
             'content': self._generate_content(articles),
             'date': latest_date,
-            'category': '综合',
+            'category': self._DEFAULT_CATEGORY,
             'source_count': len(sources),
             'sources': sources,
             'tags': tags,
-            'created_at': datetime.now().isoformat(),
+            'created_at': now_iso,
             'sentiment_analysis': sentiment_stats,  # 新增情感分析统计
             'media_analysis': {
                 'total_media': len(media_info_dict) if media_info_dict else 0,
@@ -465,37 +685,57 @@ class EventService:
         
         return event
     
-    def _generate_event_id(self, query: str) -> str:
+    # SimHash去重参数：按指纹高16位分桶，桶内汉明距离小于3视为重复
+    SIMHASH_BAND_BITS = 16
+    SIMHASH_HAMMING_THRESHOLD = 3
+
+    def _dedup_articles(self, articles: List[Dict]) -> List[Dict]:
         """
-        生成事件ID
-        
+        按标题SimHash指纹合并近似重复的文章
+
+        聚合结果中转载稿常只在标题上微调措辞，URL去重拦不住；
+        指纹按高位分桶后只在桶内比较汉明距离，避免O(n²)全量比对
+
         Args:
-            query: 查询关键词
-            
+            articles: 文章列表
+
         Returns:
-            事件ID
+            去重后的文章列表（保持原顺序，保留每组近似重复中的第一篇）
         """
-        # 使用查询词和时间戳生成唯一ID
-        unique_string = f"{query}_{datetime.now().date()}"
-        return hashlib.md5(unique_string.encode()).hexdigest()[:12]
-    
-    def _extract_tags(self, articles: List[Dict]) -> List[str]:
+        kept = []
+        buckets = defaultdict(list)
+        for article in articles:
+            title = article.get('title', '')
+            if not title:
+                kept.append(article)
+                continue
+            fingerprint = _simhash64(title)
+            bucket = buckets[fingerprint >> (64 - self.SIMHASH_BAND_BITS)]
+            if any(
+                bin(fingerprint ^ other).count('1') < self.SIMHASH_HAMMING_THRESHOLD
+                for other in bucket
+            ):
+                continue
+            bucket.append(fingerprint)
+            kept.append(article)
+
+        if len(kept) < len(articles):
+            logger.info(f"标题近似去重: {len(articles)} -> {len(kept)} 篇文章")
+        return kept
+
+    def _generate_event_id(self, query: str) -> str:
         """
-        从文章中提取标签
-        
+        生成事件ID
+
         Args:
-            articles: 文章列表
-            
+            query: 查询关键词
+
         Returns:
-            标签列表
+            事件ID
         """
-        tags = set()
-        for article in articles[:5]:  # 只从前5篇文章提取
-            # 提取文章中的标签
-            article_tags = article.get('tags', [])
-            tags.update(article_tags)
-        
-        return list(tags)[:10]  # 返回最多10个标签
+        # 使用查询词和日期生成唯一ID（事件ID只是缓存键，无需加密级哈希）；
+        # (query, 日期)对的结果整体memoize，同一天重复查询零哈希开销
+        return _event_id_for(query, datetime.now().date().isoformat())
     
     def _generate_content(self, articles: List[Dict]) -> str:
         """
@@ -509,15 +749,14 @@ class EventService:
         """
         if not articles:
             return "暂无详细内容"
-        
-        # 合并前几篇文章的摘要
-        content_parts = []
-        for i, article in enumerate(articles[:3], 1):
-            summary = article.get('summary', '')
-            if summary:
-                content_parts.append(f"{i}. {summary}")
-        
-        return "\n\n".join(content_parts) if content_parts else "暂无详细内容"
+
+        # 合并前几篇文章的摘要（生成器直接喂join，islice省去切片list分配）
+        content = "\n\n".join(
+            f"{i}. {article['summary']}"
+            for i, article in enumerate(islice(articles, 3), 1)
+            if article.get('summary')
+        )
+        return content or "暂无详细内容"
     
     def get_event_by_id(self, event_id: str) -> Optional[Dict]:
         """
@@ -534,30 +773,47 @@ class EventService:
     def get_all_events(self) -> List[Dict]:
         """
         获取所有缓存的事件（包括处理中的）
-        
+
         Returns:
             事件列表
         """
-        events = list(self.events_cache.values())
-        
-        # 更新处理中事件的进度
-        for event in events:
-            if event.get('status') == 'processing' and event.get('task_id'):
-                task = task_queue.get_task(event['task_id'])
-                if task:
-                    event['progress'] = task.progress
-                    # 如果任务已完成，更新事件状态
-                    if task.status == TaskStatus.COMPLETED:
-                        if task.result:
-                            # 重新获取完整事件数据
-                            event_id = task.result.get('event_id')
-                            if event_id and event_id in self.events_cache:
-                                events[events.index(event)] = self.events_cache[event_id]
-                    elif task.status == TaskStatus.FAILED:
-                        event['status'] = 'failed'
-                        event['error'] = task.error
-        
-        return events
+        # 只遍历在途事件集合：每次轮询的开销正比于处理中任务数，
+        # 而不是缓存中的全部事件数
+        with self.cache_lock:
+            processing_ids = list(self._processing_event_ids)
+
+        if processing_ids:
+            # 批量查询对应任务（一次加锁取回，替代逐事件get_task）
+            id_to_event = {}
+            for eid in processing_ids:
+                event = self.events_cache.get(eid)
+                if event is None or event.get('status') != 'processing':
+                    # 事件已过期或已由任务处理器写入完成态，移出在途集合
+                    with self.cache_lock:
+                        self._processing_event_ids.discard(eid)
+                    continue
+                if event.get('task_id'):
+                    id_to_event[eid] = event
+            tasks = task_queue.get_tasks(
+                event['task_id'] for event in id_to_event.values())
+
+            for eid, event in id_to_event.items():
+                task = tasks.get(event['task_id'])
+                if not task:
+                    continue
+                event['progress'] = task.progress
+                # 任务已结束的事件：完成态由处理器写入缓存，这里只收尾
+                if task.status == TaskStatus.COMPLETED:
+                    with self.cache_lock:
+                        self._processing_event_ids.discard(eid)
+                elif task.status == TaskStatus.FAILED:
+                    event['status'] = 'failed'
+                    event['error'] = task.error
+                    with self.cache_lock:
+                        self._processing_event_ids.discard(eid)
+
+        # 缓存中的事件对象已就地更新，整表只构建一次
+        return list(self.events_cache.values())
     
     def get_task_status(self, task_id: str) -> Optional[Dict]:
         """
@@ -590,7 +846,12 @@ class EventService:
             if media_name in self.media_info_cache:
                 logger.info(f"从缓存中获取媒体信息: {media_name}")
                 return self.media_info_cache[media_name]
-        
+
+        # 刚失败过的媒体短时间内不再重试（负缓存TTL内直接返回）
+        if media_name in self._media_negative_cache:
+            logger.info(f"媒体 {media_name} 近期分析失败，暂不重试")
+            return None
+
         # 检查是否配置了 API Key
         if not Config.SILICONFLOW_API_KEY:
             logger.warning("未配置 SILICONFLOW_API_KEY，跳过媒体分析")
@@ -628,7 +889,7 @@ class EventService:
             }
             
             logger.info(f"正在分析媒体: {media_name}")
-            response = requests.post(
+            response = self._http.post(
                 Config.SILICONFLOW_API_URL,
                 headers=headers,
                 json=payload,
@@ -637,15 +898,17 @@ class EventService:
             
             if response.status_code != 200:
                 logger.error(f"API 请求失败: {response.status_code} - {response.text}")
+                self._media_negative_cache[media_name] = True
                 return None
-            
+
             result = response.json()
             content = result.get('choices', [{}])[0].get('message', {}).get('content', '')
-            
+
             if not content:
                 logger.error(f"API 返回内容为空")
+                self._media_negative_cache[media_name] = True
                 return None
-            
+
             # 解析返回的内容
             media_info = self._parse_media_info(content, media_name)
             
@@ -664,9 +927,11 @@ class EventService:
             
         except requests.exceptions.Timeout:
             logger.error(f"分析媒体 {media_name} 超时")
+            self._media_negative_cache[media_name] = True
             return None
         except Exception as e:
             logger.error(f"分析媒体 {media_name} 失败: {str(e)}")
+            self._media_negative_cache[media_name] = True
             return None
     
     def _parse_media_info(self, content: str, media_name: str) -> Dict:
@@ -692,56 +957,63 @@ class EventService:
         }
         
         try:
-            # 使用正则表达式提取各个字段
-            patterns = {
-                'ownership': r'所有制[:：]\s*(.+)',
-                'funding': r'资金来源[:：]\s*(.+)',
-                'political_stance': r'政治立场[:：]\s*(.+)',
-                'content_domain': r'内容领域[:：]\s*(.+)',
-                'location': r'地理位置[:：]\s*(.+)',
-                'target_audience': r'目标受众[:：]\s*(.+)',
-                'category': r'媒体类别[:：]\s*(.+)'
-            }
-            
-            for key, pattern in patterns.items():
-                match = re.search(pattern, content)
-                if match:
-                    media_info[key] = match.group(1).strip()
-            
+            # 单趟扫描提取各个字段（预编译交替式，同一字段首次出现为准）
+            for match in _MEDIA_FIELD_RE.finditer(content):
+                key = _MEDIA_FIELD_KEYS[match.group(1)]
+                if not media_info[key]:
+                    media_info[key] = match.group(2).strip()
+
             return media_info
             
         except Exception as e:
             logger.error(f"解析媒体信息失败: {str(e)}")
             return media_info
     
-    def _analyze_sources(self, articles: List[Dict], update_progress=None, curr_step=None, total_step=None) -> Dict[str, Dict]:
+    def _analyze_sources(self, articles: List[Dict], update_progress=None, curr_step=None, total_step=None, sources: Optional[set] = None) -> Dict[str, Dict]:
         """
         分析所有文章的媒体来源（使用线程池并发处理）
-        
+
         Args:
             articles: 文章列表
             update_progress: 进度更新函数
-            
+            sources: 预先聚合好的唯一媒体集合（可选，避免重复遍历文章）
+
         Returns:
             媒体信息字典 {media_name: media_info}
         """
-        # 提取所有唯一的媒体来源
-        sources = set()
-        for article in articles:
-            source = article.get('source', '').strip()
-            if source:
-                sources.add(source)
-        
+        # 调用方未预聚合时才遍历文章提取唯一媒体来源
+        if sources is None:
+            sources = set()
+            for article in articles:
+                source = article.get('source', '').strip()
+                if source:
+                    sources.add(source)
+
         logger.info(f"发现 {len(sources)} 个唯一媒体来源")
         
         if not sources:
             return {}
-        
+
+        # 提交线程池前先筛掉缓存命中：命中项直接并入结果，
+        # 不再为每个热缓存媒体付出Future/锁/as_completed事件的开销
+        with self.cache_lock:
+            cached = {
+                source: self.media_info_cache[source]
+                for source in sources if source in self.media_info_cache
+            }
+        to_fetch = sources - cached.keys()
+        if cached:
+            logger.info(f"{len(cached)} 个媒体命中缓存，{len(to_fetch)} 个需要分析")
+
         # 分析每个媒体来源（使用线程池并发）
-        media_info_dict = {}
+        media_info_dict = dict(cached)
         total_sources = len(sources)
-        completed_count = 0
+        completed_count = len(cached)
         new_media_analyzed = 0
+
+        if not to_fetch:
+            logger.info(f"成功分析 {len(media_info_dict)} 个媒体来源（全部命中缓存）")
+            return media_info_dict
         
         # 创建锁用于线程安全的计数和进度更新
         lock = threading.Lock()
@@ -781,101 +1053,171 @@ class EventService:
                         f'步骤{curr_step}/{total_step}: 正在分析媒体来源 ({completed_count}/{total_sources})'
                     )
             
-            # 如果是新分析的媒体，立即保存到文件（防止中断导致数据丢失）
+            # 如果是新分析的媒体，立即追加到日志（防止中断导致数据丢失；
+            # O(1)追加写，不再逐媒体全量重写+重编码整个缓存）
             if is_new_media:
-                try:
-                    self._save_media_cache()
-                    logger.info(f"已保存新分析的媒体: {source}")
-                except Exception as e:
-                    logger.error(f"保存媒体缓存时出错: {str(e)}")
+                self._append_media_cache(source, media_info)
+                logger.info(f"已记录新分析的媒体: {source}")
             
             return media_info
         
-        # 使用线程池并发处理，最大10个线程
-        max_workers = min(10, total_sources)  # 不超过媒体数量
-        logger.info(f"使用 {max_workers} 个线程并发分析媒体")
-        
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # 提交所有任务
-            future_to_source = {
-                executor.submit(analyze_single_media, source): source 
-                for source in sources
-            }
-            
-            # 等待所有任务完成
-            for future in as_completed(future_to_source):
-                source = future_to_source[future]
-                try:
-                    future.result()  # 获取结果，会抛出任何异常
-                except Exception as e:
-                    logger.error(f"分析媒体 {source} 时出错: {str(e)}")
+        # 提交到常驻媒体分析线程池（纯网络等待型负载，线程几乎不占CPU；
+        # 池跨搜索任务复用，不再每个搜索任务创建/销毁一批线程）
+        logger.info(f"提交 {len(to_fetch)} 个媒体到常驻线程池并发分析")
+
+        # 只提交缓存未命中的媒体
+        future_to_source = {
+            self._media_pool.submit(analyze_single_media, source): source
+            for source in to_fetch
+        }
+
+        # 等待所有任务完成
+        for future in as_completed(future_to_source):
+            source = future_to_source[future]
+            try:
+                future.result()  # 获取结果，会抛出任何异常
+            except Exception as e:
+                logger.error(f"分析媒体 {source} 时出错: {str(e)}")
         
-        # 所有媒体分析完成
+        # 所有媒体分析完成：整轮只做一次全量整合保存
+        # （过程中每个新媒体已O(1)追加到日志，崩溃也不丢数据）
         if new_media_analyzed > 0:
-            logger.info(f"本次共新分析了 {new_media_analyzed} 个媒体（已实时保存）")
+            self._save_media_cache()
+            logger.info(f"本次共新分析了 {new_media_analyzed} 个媒体（已保存）")
         
         logger.info(f"成功分析 {len(media_info_dict)} 个媒体来源")
         return media_info_dict
     
+    @staticmethod
+    def _media_journal_file() -> str:
+        """媒体缓存的追加日志文件路径（与主JSON同名的.jsonl侧文件）"""
+        return os.path.splitext(Config.MEDIA_CACHE_FILE)[0] + '.jsonl'
+
     def _load_media_cache(self):
-        """从JSON文件加载媒体缓存"""
+        """从JSON文件加载媒体缓存，并回放追加日志中的增量条目"""
         cache_file = Config.MEDIA_CACHE_FILE
-        
+        journal_file = self._media_journal_file()
+
         try:
             # 确保目录存在
             cache_dir = os.path.dirname(cache_file)
             if cache_dir and not os.path.exists(cache_dir):
                 os.makedirs(cache_dir)
                 logger.info(f"创建缓存目录: {cache_dir}")
-            
-            # 如果文件存在，加载缓存
+
+            raw_cache = {}
             if os.path.exists(cache_file):
-                with open(cache_file, 'r', encoding='utf-8') as f:
-                    raw_cache = json.load(f)
-                
-                # 使用BERT编码器对加载的缓存进行编码（确保一致性）
-                self.media_info_cache = bert_encoder.batch_encode_media(raw_cache)
-                
-                # 如果编码后有变化，保存更新后的缓存
-                if raw_cache != self.media_info_cache:
-                    logger.info("检测到缓存数据需要编码更新，正在保存...")
-                    with open(cache_file, 'w', encoding='utf-8') as f:
-                        json.dump(self.media_info_cache, f, ensure_ascii=False, indent=2)
-                
+                with open(cache_file, 'rb') as f:
+                    raw = f.read()
+                raw_cache = orjson.loads(raw) if ORJSON_AVAILABLE else json.loads(raw)
+
+            # 回放追加日志：每行一个 {媒体名: 媒体信息}，后写覆盖先写
+            journal_entries = 0
+            if os.path.exists(journal_file):
+                with open(journal_file, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            raw_cache.update(
+                                orjson.loads(line) if ORJSON_AVAILABLE else json.loads(line))
+                            journal_entries += 1
+                        except ValueError:
+                            # 进程中断可能留下半行，跳过即可
+                            logger.warning("媒体缓存日志存在损坏行，已跳过")
+
+            schema_version = raw_cache.pop('_schema_version', 0)
+
+            if raw_cache:
+                if schema_version == self._MEDIA_CACHE_SCHEMA:
+                    # 落盘版本已是当前编码格式：条目入库前就编码过，
+                    # 热启动直接采用，省去整缓存的BERT重编码
+                    self.media_info_cache = raw_cache
+                    needs_save = journal_entries > 0
+                else:
+                    # 旧版本缓存做一次性重编码，整合后落盘即带新版本号
+                    logger.info("媒体缓存版本过旧，执行一次性重编码...")
+                    self.media_info_cache = bert_encoder.batch_encode_media(raw_cache)
+                    needs_save = True
+
+                # 日志有增量或版本升级时，整合写回主文件并清空日志
+                if needs_save:
+                    logger.info(f"整合媒体缓存（日志增量 {journal_entries} 条），正在保存...")
+                    self._save_media_cache()
+
                 logger.info(f"从文件加载了 {len(self.media_info_cache)} 个媒体缓存（已编码）")
             else:
                 logger.info("缓存文件不存在，将创建新的缓存")
                 self.media_info_cache = {}
-                
-        except json.JSONDecodeError as e:
+
+        except ValueError as e:
             logger.error(f"缓存文件格式错误: {str(e)}，将使用空缓存")
             self.media_info_cache = {}
         except Exception as e:
             logger.error(f"加载媒体缓存失败: {str(e)}，将使用空缓存")
             self.media_info_cache = {}
-    
+
+    def _append_media_cache(self, media_name: str, media_info: Dict):
+        """
+        把单个新分析的媒体追加到日志文件（O(1)写盘）
+
+        替代逐媒体的全量重写：崩溃安全性不变，加载时回放日志即可恢复，
+        下次整合保存会把增量并入主JSON并清空日志
+        """
+        try:
+            journal_file = self._media_journal_file()
+            cache_dir = os.path.dirname(journal_file)
+            if cache_dir and not os.path.exists(cache_dir):
+                os.makedirs(cache_dir)
+
+            if ORJSON_AVAILABLE:
+                line = orjson.dumps({media_name: media_info})
+            else:
+                line = json.dumps({media_name: media_info}, ensure_ascii=False).encode('utf-8')
+            with self._media_file_lock:
+                with open(journal_file, 'ab') as f:
+                    f.write(line + b'\n')
+        except Exception as e:
+            logger.error(f"追加媒体缓存日志失败: {str(e)}")
+
     def _save_media_cache(self):
-        """保存媒体缓存到JSON文件（线程安全，自动编码）"""
+        """整合保存媒体缓存到主JSON文件并清空追加日志（线程安全）"""
         cache_file = Config.MEDIA_CACHE_FILE
-        
+
         try:
             # 确保目录存在
             cache_dir = os.path.dirname(cache_file)
             if cache_dir and not os.path.exists(cache_dir):
                 os.makedirs(cache_dir)
-            
-            # 保存缓存（线程安全）
+
+            # 保存缓存（线程安全）；条目在写入内存缓存前已做过关键词编码，
+            # 无需再整体batch_encode_media一遍
             with self.cache_lock:
                 cache_data = dict(self.media_info_cache)  # 复制一份避免长时间持有锁
-            
-            # 使用BERT编码器对所有媒体信息进行编码
-            encoded_cache_data = bert_encoder.batch_encode_media(cache_data)
-            
-            with open(cache_file, 'w', encoding='utf-8') as f:
-                json.dump(encoded_cache_data, f, ensure_ascii=False, indent=2)
-            
-            logger.info(f"已保存 {len(encoded_cache_data)} 个媒体缓存到文件（已编码）")
-            
+            # 写入格式版本号，加载时据此跳过重编码
+            cache_data['_schema_version'] = self._MEDIA_CACHE_SCHEMA
+
+            # 先写临时文件再原子改名：崩溃最多留下残缺的.tmp，
+            # 主文件任何时刻都是完整一致的JSON
+            tmp_file = cache_file + '.tmp'
+            with self._media_file_lock:
+                with open(tmp_file, 'wb') as f:
+                    if ORJSON_AVAILABLE:
+                        f.write(orjson.dumps(cache_data, option=orjson.OPT_INDENT_2))
+                    else:
+                        f.write(json.dumps(
+                            cache_data, ensure_ascii=False, indent=2).encode('utf-8'))
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_file, cache_file)
+                # 增量已并入主文件，日志可以清空
+                journal_file = self._media_journal_file()
+                if os.path.exists(journal_file):
+                    os.remove(journal_file)
+
+            logger.info(f"已保存 {len(cache_data)} 个媒体缓存到文件")
+
         except Exception as e:
             logger.error(f"保存媒体缓存失败: {str(e)}")
 
@@ -988,7 +1330,7 @@ class EventService:
                     f'步骤{curr_step}/{total_step}: 正在调用AI生成事件摘要...'
                 )
             
-            response = requests.post(
+            response = self._http.post(
                 Config.SILICONFLOW_API_URL,
                 headers=headers,
                 json=payload,
@@ -1025,5 +1367,17 @@ class EventService:
             return None
 
 
-# 全局服务实例
-event_service = EventService()
\ No newline at end of file
+# 全局服务实例（惰性初始化：EventService()会启动任务队列线程，
+# 不应作为import副作用执行，首个真正用到服务的请求才付出这份开销）
+_event_service: Optional[EventService] = None
+_event_service_lock = threading.Lock()
+
+
+def get_event_service() -> EventService:
+    """获取全局EventService单例，首次调用时创建（双重检查加锁）"""
+    global _event_service
+    if _event_service is None:
+        with _event_service_lock:
+            if _event_service is None:
+                _event_service = EventService()
+    return _event_service
\ No newline at end of file
@@ -19,6 +19,10 @@ class Config:
     
     # 媒体分析缓存配置
     MEDIA_CACHE_FILE = os.getenv('MEDIA_CACHE_FILE', 'data/media_cache.json')
+
+    # 内存事件/文章缓存的容量与过期时间（限制常驻内存增长）
+    EVENTS_CACHE_MAX = int(os.getenv('EVENTS_CACHE_MAX', 1024))
+    EVENTS_CACHE_TTL = float(os.getenv('EVENTS_CACHE_TTL', 3600))
     
     # BERT 编码器记录配置
     BERT_ENCODING_RECORD_FILE = os.getenv('BERT_ENCODING_RECORD_FILE', 'data/bert_encoding_record.json')